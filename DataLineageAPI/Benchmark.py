@@ -0,0 +1,305 @@
+"""
+Synthetic-scale benchmarks for the import path.
+
+Generates dbt manifests and information_schema-shaped catalogs of any size,
+runs the connectors against a recording stand-in for the Neo4j driver and
+reports wall time, round trips, statements, parameter bytes and peak memory
+(measured on a second run, so tracing does not inflate the wall time):
+
+    python Benchmark.py --models 1000 --columns 50 --tables 500 --cte-depth 5 --join-width 3
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+from SourceConnector import CATALOG_COLUMNS, DbtSourceConnector, RedshiftSourceConnector
+from SqlLineage import extract_source_from_sql
+
+
+# --- Recording Neo4j stand-in ---
+class RecordingResult:
+    """Empty result set: every read in the import path sees an empty graph."""
+    def __iter__(self):
+        return iter([])
+
+    def data(self):
+        return []
+
+    def single(self):
+        return None
+
+    def consume(self):
+        return None
+
+
+class RecordingStats:
+    def __init__(self):
+        self.transactions = 0
+        self.auto_commit_queries = 0
+        self.statements = 0
+        self.rows = 0
+        self.parameter_bytes = 0
+
+    @property
+    def round_trips(self):
+        return self.transactions + self.auto_commit_queries
+
+    def record(self, query, parameters):
+        self.statements += 1
+        self.parameter_bytes += len(json.dumps(parameters, default=str))
+        rows = parameters.get("rows")
+        self.rows += len(rows) if isinstance(rows, list) else 1
+
+    def to_dict(self):
+        return {
+            "round_trips": self.round_trips,
+            "transactions": self.transactions,
+            "statements": self.statements,
+            "rows": self.rows,
+            "parameter_bytes": self.parameter_bytes,
+        }
+
+
+class RecordingTransaction:
+    def __init__(self, stats):
+        self.stats = stats
+
+    def run(self, query, parameters=None, **kwargs):
+        self.stats.record(query, {**(parameters or {}), **kwargs})
+        return RecordingResult()
+
+
+class RecordingSession:
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+    def run(self, query, parameters=None, **kwargs):
+        self.stats.auto_commit_queries += 1
+        return RecordingTransaction(self.stats).run(query, parameters, **kwargs)
+
+    def execute_write(self, work, *args, **kwargs):
+        self.stats.transactions += 1
+        return work(RecordingTransaction(self.stats), *args, **kwargs)
+
+    execute_read = execute_write
+
+
+class RecordingDriver:
+    """Drop-in for neo4j.Driver that counts transactions, statements and parameter bytes."""
+    def __init__(self):
+        self.stats = RecordingStats()
+
+    def session(self, **kwargs):
+        return RecordingSession(self.stats)
+
+    def close(self):
+        pass
+
+
+# --- Synthetic inputs ---
+def generate_model_sql(name, upstreams, columns, cte_depth):
+    """Compiled SQL joining `upstreams` (fully qualified relations) through a chain of `cte_depth` CTEs."""
+    aliases = [f"u{i}" for i in range(len(upstreams))]
+    select = ",\n    ".join(
+        f"{aliases[c % len(aliases)]}.col_{c} AS col_{c}" for c in range(columns)
+    )
+    joins = "\n".join(
+        f"JOIN {relation} {alias} ON {aliases[0]}.col_0 = {alias}.col_0"
+        for relation, alias in zip(upstreams[1:], aliases[1:])
+    )
+    body = f"SELECT\n    {select}\nFROM {upstreams[0]} {aliases[0]}\n{joins}"
+    if not cte_depth:
+        return body
+
+    column_list = ", ".join(f"col_{c}" for c in range(columns))
+    ctes = [f"step_0 AS (\n{body}\n)"]
+    for depth in range(1, cte_depth):
+        ctes.append(f"step_{depth} AS (SELECT {column_list} FROM step_{depth - 1})")
+    return f"WITH {', '.join(ctes)}\nSELECT {column_list} FROM step_{cte_depth - 1}"
+
+
+def generate_manifest(project_path, models=100, columns=20, join_width=2, cte_depth=0, sources=None, seed=0):
+    """Write a synthetic target/manifest.json (plus test nodes and macros to skip) and return its path."""
+    rng = random.Random(seed)
+    sources = sources or max(1, models // 10)
+    database, schema = "dev", "public"
+
+    nodes = {}
+    relations = []
+    for s in range(sources):
+        relations.append((f"source.bench.raw.src_{s}", f'"{database}"."{schema}"."src_{s}"'))
+
+    for m in range(models):
+        name = f"model_{m}"
+        picks = rng.sample(relations, min(join_width, len(relations)))
+        sql = generate_model_sql(name, [relation for _, relation in picks], columns, cte_depth)
+        unique_id = f"model.bench.{name}"
+        nodes[unique_id] = {
+            "resource_type": "model",
+            "name": name,
+            "package_name": "bench",
+            "database": database,
+            "schema": schema,
+            "description": f"Synthetic model {m}",
+            "tags": ["bench"],
+            "config": {"materialized": "table"},
+            "relation_name": f'"{database}"."{schema}"."{name}"',
+            "checksum": {"name": "sha256", "checksum": f"{m:064x}"},
+            "depends_on": {"nodes": [node_id for node_id, _ in picks]},
+            "compiled_code": sql,
+        }
+        nodes[f"test.bench.not_null_{name}"] = {
+            "resource_type": "test",
+            "name": f"not_null_{name}",
+            "compiled_code": f"SELECT * FROM {name} WHERE col_0 IS NULL",
+        }
+        relations.append((unique_id, f'"{database}"."{schema}"."{name}"'))
+
+    manifest = {
+        "metadata": {"adapter_type": "redshift", "dbt_version": "bench"},
+        "nodes": nodes,
+        "macros": {f"macro.bench.m_{i}": {"macro_sql": "{% macro m() %}{% endmacro %}"} for i in range(models)},
+    }
+    path = Path(project_path) / "target" / "manifest.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(manifest, f)
+    return path
+
+
+def generate_catalog(tables=100, columns=20, fk_every=5, schema="public", seed=0):
+    """information_schema-shaped catalog DataFrame (CATALOG_COLUMNS) with PKs and some FKs."""
+    rng = random.Random(seed)
+    rows = []
+    for t in range(tables):
+        table = f"table_{t}"
+        for c in range(columns):
+            if c == 0:
+                rows.append((schema, table, "col_0", "integer", "NO", "PRIMARY KEY", f"{table}_pkey", None, None, None, "BASE TABLE"))
+            elif fk_every and c % fk_every == 0 and t > 0:
+                ref = f"table_{rng.randrange(t)}"
+                rows.append((schema, table, f"col_{c}", "integer", "YES", "FOREIGN KEY", f"{table}_col_{c}_fkey", schema, ref, "col_0", "BASE TABLE"))
+            else:
+                rows.append((schema, table, f"col_{c}", "character varying", "YES", None, None, None, None, None, "BASE TABLE"))
+    return pd.DataFrame(rows, columns=CATALOG_COLUMNS)
+
+
+class SyntheticRedshiftConnector(RedshiftSourceConnector):
+    """RedshiftSourceConnector reading a generated catalog instead of the warehouse."""
+    def __init__(self, columns_df, **kwargs):
+        super().__init__(schema_name=[], db_name="dev", **kwargs)
+        self.synthetic_df = columns_df
+
+    def _get_columns(self, progress=None):
+        return self.synthetic_df
+
+
+# --- Scenarios ---
+def measure(make_run):
+    """
+    Return the wall time of `make_run()()` and its peak traced memory, taken
+    on two separate runs, each from a fresh `make_run()`: tracemalloc slows
+    Python-heavy code down several times over, so it is off while timing.
+    """
+    run = make_run()
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+
+    run = make_run()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": round(elapsed, 3), "peak_memory_mb": round(peak / 1024 / 1024, 1)}
+
+
+def bench_extract_sql(columns=50, join_width=3, cte_depth=10, repeat=5):
+    upstreams = [f'"dev"."public"."src_{i}"' for i in range(join_width)]
+    sql = generate_model_sql("bench", upstreams, columns, cte_depth)
+    result = measure(lambda: lambda: [extract_source_from_sql(sql) for _ in range(repeat)])
+    result["per_statement_ms"] = round(result["seconds"] / repeat * 1000, 1)
+    return result
+
+
+def bench_dbt_import(models=100, columns=20, join_width=2, cte_depth=0, workers=1, batch_size=1000):
+    with tempfile.TemporaryDirectory() as project_path:
+        generate_manifest(project_path, models, columns, join_width, cte_depth)
+        connectors = []
+
+        def make_run():
+            # A fresh lineage cache per run, so the memory run parses as much as the timed one
+            connector = DbtSourceConnector(project_path, workers=workers, batch_size=batch_size,
+                                           lineage_cache_dir=Path(project_path) / f"cache_{len(connectors)}")
+            connector.driver = RecordingDriver()
+            connectors.append(connector)
+            return connector.import_metadata_neo4j
+
+        result = measure(make_run)
+        result.update(connectors[0].driver.stats.to_dict())
+    return result
+
+
+def bench_redshift_import(tables=100, columns=20, batch_size=1000):
+    catalog = generate_catalog(tables, columns)
+    connectors = []
+
+    def make_run():
+        connector = SyntheticRedshiftConnector(catalog, batch_size=batch_size)
+        connector.driver = RecordingDriver()
+        connectors.append(connector)
+        return connector.import_metadata_neo4j
+
+    result = measure(make_run)
+    result.update(connectors[0].driver.stats.to_dict())
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic-scale benchmarks for the lineage import path.")
+    parser.add_argument("--scenario", choices=["all", "extract_sql", "dbt_import", "redshift_import"], default="all")
+    parser.add_argument("--models", type=int, default=200)
+    parser.add_argument("--columns", type=int, default=20)
+    parser.add_argument("--join-width", type=int, default=2)
+    parser.add_argument("--cte-depth", type=int, default=3)
+    parser.add_argument("--tables", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    if args.scenario in ("all", "extract_sql"):
+        results["extract_sql"] = bench_extract_sql(args.columns, args.join_width, args.cte_depth)
+    if args.scenario in ("all", "dbt_import"):
+        results["dbt_import"] = bench_dbt_import(args.models, args.columns, args.join_width, args.cte_depth,
+                                                 args.workers, args.batch_size)
+    if args.scenario in ("all", "redshift_import"):
+        results["redshift_import"] = bench_redshift_import(args.tables, args.columns, args.batch_size)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, result in results.items():
+            print(f"📊 {name}: " + ", ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
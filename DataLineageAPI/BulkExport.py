@@ -0,0 +1,253 @@
+"""
+Offline bulk export for the initial load of an empty Neo4j database.
+
+Writes the nodes and relationships the connectors would MERGE online as
+deduplicated CSV files (optionally gzip-compressed, optionally also Parquet)
+in the `neo4j-admin database import` header format:
+
+    python BulkExport.py --output /tmp/lineage-import --gzip
+    neo4j-admin database import full neo4j $(cat /tmp/lineage-import/import.args)
+"""
+import argparse
+import csv
+import gzip
+import os
+from pathlib import Path
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from LineageGraph import table_key
+
+load_dotenv()
+
+DBT_PROJECT_PATH = os.getenv("DBT_PROJECT_PATH")
+
+# (label, ID space column, property columns); `None` as ID column keeps the id out of the
+# node properties, since Table nodes are identified by their location and source online
+NODE_FILES = [
+    ("DbtModel", "id:ID(DbtModel)", ["name", "description", "tags:string[]", "materialized",
+                                     "package_name", "database", "schema", "checksum", "catalog_digest",
+                                     "resolver_version"]),
+    ("Table", ":ID(Table)", ["name", "schema", "db_name", "source", "object_type"]),
+    ("Column", "id:ID(Column)", ["name", "table_name", "schema", "db_name", "data_type",
+                                 "is_nullable", "constraint_type", "constraint_name"]),
+]
+
+# Relationship type -> (start label, end label), same direction as the Neo4j relationships
+RELATIONSHIP_FILES = {
+    "FEEDS_DATA_INTO": ("Table", "DbtModel"),
+    "PROCEEDS_TO": ("DbtModel", "DbtModel"),
+    "GENERATES": ("DbtModel", "Table"),
+    "TRANSFORMED_TO": ("Column", "Column"),
+    "BELONGS_TO": ("Column", "Table"),
+    "REFERENCES": ("Column", "Column"),
+}
+
+ARRAY_DELIMITER = ";"
+
+
+def _property_name(column):
+    return column.split(":", 1)[0]
+
+
+class Neo4jImportExporter:
+    """
+    Collects node properties and relationships from the records returned by
+    DbtSourceConnector.build_records / RedshiftSourceConnector.build_records,
+    resolving MATCH-based relationships the way the online queries do, and
+    writes them as neo4j-admin import files.
+    """
+    def __init__(self):
+        self.nodes = {label: {} for label, _, _ in NODE_FILES}
+        self.relationships = {rel_type: set() for rel_type in RELATIONSHIP_FILES}
+        # MATCHes resolved once every record is in
+        self._pending = []
+
+    def _node(self, label, key, properties):
+        # Like consecutive SETs: later records overwrite the properties they carry
+        node = self.nodes[label].setdefault(key, {})
+        node.update(properties)
+        return key
+
+    def _table(self, db_name, schema, name, source, **properties):
+        return self._node("Table", table_key(db_name, schema, name, source), {
+            "name": name, "schema": schema, "db_name": db_name, "source": source, **properties
+        })
+
+    def add_dbt_records(self, records):
+        for m in records["models"]:
+            self._node("DbtModel", m["model_id"], {
+                "name": m["model_name"],
+                "description": m["description"],
+                "tags": m["tags"],
+                "materialized": m["materialized"],
+                "package_name": m["package_name"],
+                "database": m["database"],
+                "schema": m["schema"],
+                "checksum": m["checksum"],
+                "catalog_digest": m["catalog_digest"],
+                "resolver_version": m["resolver_version"],
+            })
+        for s in records["sources"]:
+            self._table(s["db_name"], s["schema_name"], s["table_name"], s["source"])
+        for rel in records["generates"]:
+            table = self._table(rel["db_name"], rel["schema_name"], rel["table_name"], rel["source_name"])
+            self.relationships["GENERATES"].add((rel["model_id"], table))
+        for rel in records["model_sources"]:
+            self._pending.append(("FEEDS_DATA_INTO", (rel["db_name"], rel["schema_name"], rel["table_name"]), rel["model_id"]))
+        for rel in records["model_dependencies"]:
+            self._pending.append(("PROCEEDS_TO", rel["depends_on_id"], rel["model_id"]))
+
+        self.add_column_records(records)
+
+    def add_column_records(self, records):
+        """Column nodes, TRANSFORMED_TO and BELONGS_TO (dbt models and mined Redshift queries)."""
+        for c in records["columns"]:
+            self._node("Column", c["id"], {
+                "name": c["name"], "table_name": c["table_name"], "schema": c["schema"], "db_name": c["db_name"]
+            })
+            # Like coalesce(row.data_type, c.data_type): a missing type keeps the known one
+            if c.get("data_type") is not None:
+                self._node("Column", c["id"], {"data_type": c["data_type"]})
+        for rel in records["transformed_to"]:
+            self._pending.append(("TRANSFORMED_TO", rel["source_id"], rel["target_id"]))
+        for rel in records["belongs_to"]:
+            table = self._table(rel["db_name"], rel["schema"], rel["table_name"], rel["source"])
+            self.relationships["BELONGS_TO"].add((rel["column_id"], table))
+
+    def add_redshift_records(self, records):
+        for t in records["tables"]:
+            self._table(t["db_name"], t["schema_name"], t["table_name"], "redshift", object_type=t["object_type"])
+        for c in records["columns"]:
+            table = self._table(c["db_name"], c["schema_name"], c["table_name"], "redshift")
+            self._node("Column", c["id"], {
+                "name": c["column_name"],
+                "table_name": c["table_name"],
+                "schema": c["schema_name"],
+                "db_name": c["db_name"],
+                "data_type": c["data_type"],
+                "is_nullable": c["is_nullable"],
+                "constraint_type": c["constraint_type"],
+                "constraint_name": c["constraint_name"],
+            })
+            self.relationships["BELONGS_TO"].add((c["id"], table))
+        for fk in records["foreign_keys"]:
+            self._pending.append(("REFERENCES", fk["source_id"], fk["target_id"]))
+
+    def resolve(self):
+        """Resolve pending MATCH relationships; relationships to missing nodes are dropped like a failed MATCH."""
+        tables_by_location = {}
+        for key, table in self.nodes["Table"].items():
+            tables_by_location.setdefault((table["db_name"], table["schema"], table["name"]), []).append(key)
+
+        for rel_type, start, end in self._pending:
+            start_label, end_label = RELATIONSHIP_FILES[rel_type]
+            if rel_type == "FEEDS_DATA_INTO":
+                # Matched on name/schema/db_name only, whatever the source of the Table
+                starts = tables_by_location.get(start, [])
+            else:
+                starts = [start] if start in self.nodes[start_label] else []
+            if end not in self.nodes[end_label]:
+                continue
+            for key in starts:
+                self.relationships[rel_type].add((key, end))
+        self._pending = []
+
+    def node_frame(self, label, id_column, columns):
+        rows = [
+            {id_column: key, **{column: node.get(_property_name(column)) for column in columns}}
+            for key, node in sorted(self.nodes[label].items())
+        ]
+        return pd.DataFrame(rows, columns=[id_column, *columns, ":LABEL"]).assign(**{":LABEL": label})
+
+    def relationship_frame(self, rel_type):
+        start_label, end_label = RELATIONSHIP_FILES[rel_type]
+        rows = sorted(self.relationships[rel_type])
+        return pd.DataFrame(rows, columns=[f":START_ID({start_label})", f":END_ID({end_label})"]).assign(**{":TYPE": rel_type})
+
+    def write(self, output_dir, compress=False, parquet=False):
+        """
+        Write one file per label and per relationship type to `output_dir`, plus
+        `import.args` holding the matching neo4j-admin --nodes/--relationships
+        arguments. Returns {file name: row count}.
+        """
+        self.resolve()
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        suffix = ".csv.gz" if compress else ".csv"
+        written = {}
+        # dbt descriptions often span several lines, which neo4j-admin rejects by default
+        arguments = [f"--array-delimiter={ARRAY_DELIMITER}", "--multiline-fields=true"]
+
+        frames = [
+            (f"nodes_{label.lower()}", f"--nodes={label}", self.node_frame(label, id_column, columns))
+            for label, id_column, columns in NODE_FILES
+        ] + [
+            (f"relationships_{rel_type.lower()}", f"--relationships={rel_type}", self.relationship_frame(rel_type))
+            for rel_type in RELATIONSHIP_FILES
+        ]
+        for name, argument, frame in frames:
+            path = output_dir / f"{name}{suffix}"
+            self._write_csv(frame, path, compress)
+            written[path.name] = len(frame)
+            arguments.append(f"{argument}={path.resolve()}")
+            if parquet:
+                # pyarrow / fastparquet is only needed for this optional output
+                frame.to_parquet(output_dir / f"{name}.parquet", index=False)
+            print(f"📦 Wrote {len(frame)} rows to {path.name}")
+
+        with open(output_dir / "import.args", "w") as f:
+            f.write(" ".join(arguments) + "\n")
+        return written
+
+    @staticmethod
+    def _write_csv(frame, path, compress):
+        opener = gzip.open if compress else open
+        with opener(path, "wt", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(frame.columns)
+            for row in frame.itertuples(index=False):
+                writer.writerow(
+                    ARRAY_DELIMITER.join(value) if isinstance(value, list)
+                    # pandas turns None into NaN in string columns
+                    else "" if value is None or pd.isna(value)
+                    else value
+                    for value in row
+                )
+
+
+def export_neo4j_import_files(output_dir, dbt_connector=None, redshift_connector=None, redshift_columns_df=None,
+                              compress=False, parquet=False):
+    """
+    Export a dbt project's manifest.json and/or a Redshift catalog as
+    neo4j-admin import files, without Neo4j. Every compiled dbt model is
+    included, whatever was imported before.
+    """
+    exporter = Neo4jImportExporter()
+    if dbt_connector is not None:
+        for _, records in dbt_connector.iter_record_windows():
+            exporter.add_dbt_records(records)
+    if redshift_connector is not None:
+        exporter.add_redshift_records(redshift_connector.build_records(redshift_columns_df))
+    return exporter.write(output_dir, compress=compress, parquet=parquet)
+
+
+def main():
+    from SourceConnector import DbtSourceConnector, RedshiftSourceConnector
+
+    parser = argparse.ArgumentParser(description="Export lineage metadata as neo4j-admin import files.")
+    parser.add_argument("--output", required=True, help="directory the files are written to")
+    parser.add_argument("--source", choices=["all", "dbt", "redshift"], default="all")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the CSV files")
+    parser.add_argument("--parquet", action="store_true", help="also write Parquet files")
+    args = parser.parse_args()
+
+    dbt_connector = DbtSourceConnector(DBT_PROJECT_PATH) if args.source in ("all", "dbt") else None
+    redshift_connector = RedshiftSourceConnector() if args.source in ("all", "redshift") else None
+    export_neo4j_import_files(args.output, dbt_connector, redshift_connector, compress=args.gzip, parquet=args.parquet)
+    print(f"✅ Exported to {args.output}; load with: neo4j-admin database import full <database> $(cat {args.output}/import.args)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+import Metrics
+from ImportJobs import ImportProgress
+from ManifestReader import iter_manifest_nodes
+from Neo4jClient import NEO4J_BATCH_SIZE, Neo4jConnector, write_batches
+from SourceConnector import DbtSourceConnector, NEO4J_PASSWORD, NEO4J_URI, NEO4J_USERNAME
+
+load_dotenv()
+
+# Comma separated dbt project directories imported together
+DBT_PROJECT_PATHS = os.getenv("DBT_PROJECT_PATHS")
+# Manifests read concurrently
+DBT_FEDERATION_WORKERS = int(os.getenv("DBT_FEDERATION_WORKERS", "8"))
+# Projects imported into Neo4j concurrently. Shared Table nodes are safe to MERGE concurrently
+# (uniqueness constraint); each import starts its own pool of LINEAGE_WORKERS parsing processes
+DBT_FEDERATION_IMPORT_WORKERS = int(os.getenv("DBT_FEDERATION_IMPORT_WORKERS", str(DBT_FEDERATION_WORKERS)))
+
+# FEEDS_DATA_INTO: table generated by a model of one project -> model of another project reading it as a source
+CROSS_PROJECT_FEEDS_QUERY = """
+    UNWIND $rows AS row
+    MATCH (:DbtModel {id: row.producer_id})-[:GENERATES]->(t:Table)
+    MATCH (m:DbtModel {id: row.consumer_id})
+    MERGE (t)-[:FEEDS_DATA_INTO]->(m)
+"""
+
+
+def relation_key(database, schema, identifier):
+    """Physical `db.schema.table` key, compared case-insensitively like Redshift identifiers."""
+    if not (database and schema and identifier):
+        return None
+    return ".".join(part.replace('"', "").lower() for part in (database, schema, identifier))
+
+
+def node_relation_key(node):
+    """Physical key of a manifest model or source node."""
+    relation_name = node.get("relation_name")
+    if relation_name:
+        parts = relation_name.replace('"', "").split(".")
+        if len(parts) == 3:
+            return relation_key(*parts)
+    return relation_key(node.get("database"), node.get("schema"), node.get("identifier") or node.get("alias") or node.get("name"))
+
+
+def scan_manifest(manifest_path):
+    """
+    Read the models and sources of one manifest and return
+    {"generates": {relation key: [model_id]}, "consumes": [(relation key, model_id)]}.
+    """
+    generates = {}
+    source_keys = {}
+    source_deps = []
+    for resource_type, node_id, node in iter_manifest_nodes(manifest_path):
+        if resource_type == "source":
+            source_keys[node_id] = node_relation_key(node)
+            continue
+        key = node_relation_key(node)
+        if key:
+            generates.setdefault(key, []).append(node_id)
+        for dep in node.get("depends_on", {}).get("nodes", []):
+            if dep.startswith("source."):
+                source_deps.append((dep, node_id))
+
+    consumes = [(source_keys.get(dep), model_id) for dep, model_id in source_deps]
+    return {"generates": generates, "consumes": [(key, model_id) for key, model_id in consumes if key]}
+
+
+class DbtFederation(Neo4jConnector):
+    """
+    Imports many dbt projects whose sources are other projects' models.
+
+    Manifests are scanned concurrently into one hashed index of the physical
+    `db.schema.table` each model generates. Every project is imported with its
+    own DbtSourceConnector, then tables generated in one project are linked to
+    the models of other projects reading them as sources, in one batched pass.
+    """
+    def __init__(self, project_paths=DBT_PROJECT_PATHS, neo4j_uri=NEO4J_URI, neo4j_user=NEO4J_USERNAME, neo4j_password=NEO4J_PASSWORD,
+                 batch_size=NEO4J_BATCH_SIZE, workers=DBT_FEDERATION_WORKERS, import_workers=DBT_FEDERATION_IMPORT_WORKERS,
+                 reachability_index=None, **connector_kwargs):
+        super().__init__(neo4j_uri, neo4j_user, neo4j_password)
+        # A comma separated string or a list of project directories
+        if isinstance(project_paths, str):
+            project_paths = [p.strip() for p in project_paths.split(",") if p.strip()]
+        self.batch_size = batch_size
+        self.workers = workers
+        self.import_workers = import_workers
+        self.reachability_index = reachability_index
+        self.connectors = [
+            DbtSourceConnector(path, neo4j_uri, neo4j_user, neo4j_password, batch_size=batch_size,
+                               reachability_index=reachability_index, **connector_kwargs)
+            for path in project_paths or []
+        ]
+
+    def _manifest_path(self, connector):
+        manifest_path = connector.project_path / "target" / "manifest.json"
+        if not manifest_path.exists():
+            raise FileNotFoundError(f"{manifest_path} not found. Run dbt first!")
+        return manifest_path
+
+    def build_index(self):
+        """Scan every manifest concurrently; return ({relation key: [(project, model_id)]}, per-project scans)."""
+        workers = max(1, min(self.workers, len(self.connectors)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            scans = list(executor.map(lambda c: scan_manifest(self._manifest_path(c)), self.connectors))
+
+        index = {}
+        for project, scan in enumerate(scans):
+            for key, model_ids in scan["generates"].items():
+                index.setdefault(key, []).extend((project, model_id) for model_id in model_ids)
+        return index, scans
+
+    def build_cross_project_records(self, index, scans):
+        """FEEDS_DATA_INTO rows from other projects' generating models to each source consumer."""
+        rows = set()
+        for project, scan in enumerate(scans):
+            for key, consumer_id in scan["consumes"]:
+                for producer_project, producer_id in index.get(key, []):
+                    if producer_project != project:
+                        rows.add((producer_id, consumer_id))
+        return [{"producer_id": producer_id, "consumer_id": consumer_id} for producer_id, consumer_id in sorted(rows)]
+
+    @Metrics.traced("dbt_federation")
+    def import_metadata_neo4j(self, full_refresh=False, progress=None):
+        progress = progress or ImportProgress()
+        if not self.connectors:
+            print("⚠️ No dbt projects configured (DBT_PROJECT_PATHS).")
+            return
+
+        progress.phase(f"scanning {len(self.connectors)} manifests")
+        with Metrics.span("manifest_load"):
+            index, scans = self.build_index()
+        print(f"📚 Indexed {len(index)} generated tables across {len(self.connectors)} projects")
+
+        progress.phase("importing projects")
+        workers = max(1, min(self.import_workers, len(self.connectors)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # list() re-raises the first failing project
+            list(executor.map(lambda c: c.import_metadata_neo4j(full_refresh=full_refresh, progress=progress), self.connectors))
+
+        progress.phase("linking projects")
+        rows = self.build_cross_project_records(index, scans)
+        print(f"🔗 Linking {len(rows)} cross-project sources...")
+        with self.driver.session() as session, Metrics.span("neo4j_write"):
+            write_batches(session, CROSS_PROJECT_FEEDS_QUERY, rows, self.batch_size, progress)
+        if self.reachability_index is not None:
+            self.reachability_index.add_cross_project_feeds(rows)
+            self.reachability_index.save()
+        progress.count("cross_project_links", len(rows))
+        print(f"✅ Imported {len(self.connectors)} dbt projects ({len(rows)} cross-project links).")
@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Imports running at the same time (dbt and Redshift imports are independent)
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+# Finished jobs kept around for GET /jobs
+IMPORT_JOB_HISTORY = int(os.getenv("IMPORT_JOB_HISTORY", "100"))
+
+
+class ImportProgress:
+    """
+    Progress sink handed to the connectors' import methods: the current phase,
+    named row counters and a short log. Thread-safe; usable on its own when an
+    import is not run as a job.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phase_name = None
+        self.counts = {}
+        self.log_lines = []
+
+    def phase(self, name):
+        with self._lock:
+            self.phase_name = name
+            self.log_lines.append(f"{time.strftime('%H:%M:%S')} {name}")
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def log(self, line):
+        with self._lock:
+            self.log_lines.append(line)
+
+
+class ImportJob(ImportProgress):
+    """A background import of one source ("dbt", "redshift") or a group of child jobs ("all")."""
+    def __init__(self, source, children=None):
+        super().__init__()
+        self.id = uuid.uuid4().hex
+        self.source = source
+        self.children = children or []
+        self.status = "queued"
+        self.errors = []
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def active(self):
+        if self.children:
+            return any(child.active for child in self.children)
+        return self.status in ("queued", "running")
+
+    def run(self, target):
+        self.status = "running"
+        self.started_at = time.time()
+        try:
+            target(self)
+            self.status = "succeeded"
+        except Exception as e:
+            traceback.print_exc()
+            self.errors.append(f"{type(e).__name__}: {e}")
+            self.status = "failed"
+        finally:
+            self.finished_at = time.time()
+            self.phase("finished")
+
+    def to_dict(self):
+        if self.children:
+            children = [child.to_dict() for child in self.children]
+            statuses = {child["status"] for child in children}
+            if self.active:
+                status = "queued" if statuses == {"queued"} else "running"
+            else:
+                status = "failed" if "failed" in statuses else "succeeded"
+            return {
+                "id": self.id,
+                "source": self.source,
+                "status": status,
+                "created_at": self.created_at,
+                "jobs": children,
+                "errors": [error for child in children for error in child["errors"]]
+            }
+
+        with self._lock:
+            counts = dict(self.counts)
+            log = list(self.log_lines[-50:])
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        rows = counts.get("rows_written", 0)
+        return {
+            "id": self.id,
+            "source": self.source,
+            "status": self.status,
+            "phase": self.phase_name,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round(elapsed, 3),
+            "counts": counts,
+            "rows_per_second": round(rows / elapsed, 1) if elapsed else None,
+            "errors": list(self.errors),
+            "log": log
+        }
+
+
+class ImportJobManager:
+    """
+    Runs imports in a thread pool and keeps their status.
+
+    Submitting an import for a source that already has a queued or running job
+    returns that job instead of starting a second one.
+    """
+    def __init__(self, workers=IMPORT_WORKERS, history=IMPORT_JOB_HISTORY):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._active = {}
+        self._history = history
+        self._listeners = []
+
+    def on_finished(self, callback):
+        """Register callback(job) run after every job finishes."""
+        self._listeners.append(callback)
+
+    def _remember(self, job):
+        self._jobs[job.id] = job
+        while len(self._jobs) > self._history:
+            oldest = next(iter(self._jobs))
+            if self._jobs[oldest].active:
+                break
+            del self._jobs[oldest]
+
+    def submit(self, source, target):
+        """Run target(job) in the background for `source`, coalescing with an active job of the same source."""
+        with self._lock:
+            job = self._active.get(source)
+            if job is not None and job.active:
+                return job
+            job = ImportJob(source)
+            self._active[source] = job
+            self._remember(job)
+
+        def run():
+            job.run(target)
+            with self._lock:
+                if self._active.get(source) is job:
+                    del self._active[source]
+            for callback in self._listeners:
+                try:
+                    callback(job)
+                except Exception:
+                    traceback.print_exc()
+
+        self._executor.submit(run)
+        return job
+
+    def submit_group(self, source, targets):
+        """Run several {source: target} imports concurrently under one group job."""
+        with self._lock:
+            group = self._active.get(source)
+            if group is not None and group.active:
+                return group
+
+        children = [self.submit(child_source, target) for child_source, target in targets.items()]
+        with self._lock:
+            group = ImportJob(source, children=children)
+            self._active[source] = group
+            self._remember(group)
+        return group
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
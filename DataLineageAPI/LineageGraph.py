@@ -0,0 +1,307 @@
+import json
+from bisect import bisect_left
+from collections import deque
+
+import numpy as np
+
+# Edge types of the lineage graph, in the same direction as the Neo4j relationships
+EDGE_TYPES = ["TRANSFORMED_TO", "BELONGS_TO", "FEEDS_DATA_INTO", "PROCEEDS_TO", "GENERATES", "REFERENCES"]
+EDGE_TYPE_CODES = {name: code for code, name in enumerate(EDGE_TYPES)}
+# Edges followed by default for ancestors/descendants (data flow, not structure)
+LINEAGE_EDGE_TYPES = ("TRANSFORMED_TO", "FEEDS_DATA_INTO", "PROCEEDS_TO", "GENERATES")
+
+LABELS = ["Column", "Table", "DbtModel"]
+LABEL_CODES = {name: code for code, name in enumerate(LABELS)}
+
+SNAPSHOT_MAGIC = b"LNGRAPH1"
+KEY_SEPARATOR = "\x1f"
+
+
+def table_key(db_name, schema, name, source):
+    """Key of a Table node; Tables are identified by location and source like the Neo4j MERGE."""
+    return f"{db_name}.{schema}.{name}|{source}"
+
+
+class LineageGraphBuilder:
+    """
+    Collects the nodes and edges the connectors write to Neo4j, from the records
+    returned by DbtSourceConnector.build_records / RedshiftSourceConnector.build_records,
+    and freezes them into a LineageGraph.
+    """
+    def __init__(self):
+        self._ids = {}
+        self._keys = []
+        self._edges = set()
+        # MATCHes resolved once every record is in: FEEDS_DATA_INTO / PROCEEDS_TO / REFERENCES
+        self._pending = []
+
+    def node(self, label, key):
+        full_key = f"{label}{KEY_SEPARATOR}{key}"
+        node_id = self._ids.get(full_key)
+        if node_id is None:
+            node_id = len(self._keys)
+            self._ids[full_key] = node_id
+            self._keys.append(full_key)
+        return node_id
+
+    def edge(self, edge_type, source, target):
+        self._edges.add((source, target, EDGE_TYPE_CODES[edge_type]))
+
+    def add_dbt_records(self, records):
+        for m in records["models"]:
+            self.node("DbtModel", m["model_id"])
+        for s in records["sources"]:
+            self.node("Table", table_key(s["db_name"], s["schema_name"], s["table_name"], s["source"]))
+        for rel in records["generates"]:
+            table = self.node("Table", table_key(rel["db_name"], rel["schema_name"], rel["table_name"], rel["source_name"]))
+            self.edge("GENERATES", self.node("DbtModel", rel["model_id"]), table)
+        for rel in records["model_sources"]:
+            # Neo4j MATCHes the source Table on name/schema/db_name only, whatever its source
+            location = f"{rel['db_name']}.{rel['schema_name']}.{rel['table_name']}|"
+            self._pending.append(("FEEDS_DATA_INTO", ("Table", location), ("DbtModel", rel["model_id"])))
+        for rel in records["model_dependencies"]:
+            self._pending.append(("PROCEEDS_TO", ("DbtModel", rel["depends_on_id"]), ("DbtModel", rel["model_id"])))
+
+        for c in records["columns"]:
+            self.node("Column", c["id"])
+        for rel in records["transformed_to"]:
+            self.edge("TRANSFORMED_TO", self.node("Column", rel["source_id"]), self.node("Column", rel["target_id"]))
+        for rel in records["belongs_to"]:
+            table = self.node("Table", table_key(rel["db_name"], rel["schema"], rel["table_name"], rel["source"]))
+            self.edge("BELONGS_TO", self.node("Column", rel["column_id"]), table)
+
+    def add_redshift_records(self, records):
+        for t in records["tables"]:
+            self.node("Table", table_key(t["db_name"], t["schema_name"], t["table_name"], "redshift"))
+        for c in records["columns"]:
+            table = self.node("Table", table_key(c["db_name"], c["schema_name"], c["table_name"], "redshift"))
+            self.edge("BELONGS_TO", self.node("Column", c["id"]), table)
+        for fk in records["foreign_keys"]:
+            self._pending.append(("REFERENCES", ("Column", fk["source_id"]), ("Column", fk["target_id"])))
+
+    def _matches(self, label, key, by_prefix):
+        if key.endswith("|"):
+            return by_prefix.get((label, key), [])
+        node_id = self._ids.get(f"{label}{KEY_SEPARATOR}{key}")
+        return [] if node_id is None else [node_id]
+
+    def build(self):
+        """Resolve pending MATCH edges, intern keys in sorted order and build CSR adjacency."""
+        by_prefix = {}
+        for full_key, node_id in self._ids.items():
+            label, key = full_key.split(KEY_SEPARATOR, 1)
+            if label == "Table":
+                by_prefix.setdefault((label, key.rsplit("|", 1)[0] + "|"), []).append(node_id)
+
+        edges = set(self._edges)
+        for edge_type, (src_label, src_key), (dst_label, dst_key) in self._pending:
+            for source in self._matches(src_label, src_key, by_prefix):
+                for target in self._matches(dst_label, dst_key, by_prefix):
+                    edges.add((source, target, EDGE_TYPE_CODES[edge_type]))
+
+        # Renumber nodes so ids follow the sorted key order (binary search on lookup)
+        order = sorted(range(len(self._keys)), key=lambda i: self._keys[i].encode("utf-8"))
+        remap = np.empty(len(order), dtype=np.int32)
+        remap[np.array(order, dtype=np.int64)] = np.arange(len(order), dtype=np.int32)
+        keys = [self._keys[i] for i in order]
+
+        edge_array = np.array(sorted(edges), dtype=np.int64).reshape(-1, 3)
+        sources = remap[edge_array[:, 0]] if len(edge_array) else np.empty(0, dtype=np.int32)
+        targets = remap[edge_array[:, 1]] if len(edge_array) else np.empty(0, dtype=np.int32)
+        types = edge_array[:, 2].astype(np.uint8)
+
+        return LineageGraph.from_arrays(keys, sources, targets, types)
+
+
+def _csr(n, sources, targets, types):
+    order = np.lexsort((targets, sources))
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.add.at(offsets, sources + 1, 1)
+    np.cumsum(offsets, out=offsets)
+    return offsets, targets[order].astype(np.int32), types[order].astype(np.uint8)
+
+
+class _KeyView:
+    """Sequence view over the interned key blob, used for binary search."""
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]])
+
+
+class LineageGraph:
+    """
+    Immutable lineage graph: node keys interned to integers (sorted, so lookups
+    are a binary search) and adjacency stored as CSR arrays in both directions.
+    Can be saved to a single binary snapshot and memory-mapped back.
+    """
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.key_blob = arrays["key_blob"]
+        self.key_offsets = arrays["key_offsets"]
+        self.labels = arrays["labels"]
+        self.out_offsets = arrays["out_offsets"]
+        self.out_targets = arrays["out_targets"]
+        self.out_types = arrays["out_types"]
+        self.in_offsets = arrays["in_offsets"]
+        self.in_targets = arrays["in_targets"]
+        self.in_types = arrays["in_types"]
+        self._keys = _KeyView(self.key_blob, self.key_offsets)
+
+    @classmethod
+    def from_arrays(cls, keys, sources, targets, types):
+        encoded = [key.encode("utf-8") for key in keys]
+        key_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(k) for k in encoded], out=key_offsets[1:])
+        key_blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        labels = np.array([LABEL_CODES[key.split(KEY_SEPARATOR, 1)[0]] for key in keys], dtype=np.uint8)
+
+        n = len(keys)
+        out_offsets, out_targets, out_types = _csr(n, sources, targets, types)
+        in_offsets, in_targets, in_types = _csr(n, targets, sources, types)
+        return cls({
+            "key_blob": key_blob,
+            "key_offsets": key_offsets,
+            "labels": labels,
+            "out_offsets": out_offsets,
+            "out_targets": out_targets,
+            "out_types": out_types,
+            "in_offsets": in_offsets,
+            "in_targets": in_targets,
+            "in_types": in_types,
+        })
+
+    @property
+    def node_count(self):
+        return len(self.key_offsets) - 1
+
+    @property
+    def edge_count(self):
+        return len(self.out_targets)
+
+    # --- Snapshots ---
+    def save(self, path):
+        """Write a single-file snapshot: magic, JSON header, then 8-byte aligned arrays."""
+        layout = {}
+        offset = 0
+        for name, array in self.arrays.items():
+            layout[name] = [array.dtype.str, offset, int(array.size)]
+            offset += array.nbytes
+            offset += -offset % 8
+        header = json.dumps({"edge_types": EDGE_TYPES, "labels": LABELS, "arrays": layout}).encode("utf-8")
+        header += b" " * (-(len(SNAPSHOT_MAGIC) + 8 + len(header)) % 8)
+
+        with open(path, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(np.uint64(len(header)).tobytes())
+            f.write(header)
+            position = 0
+            for name, array in self.arrays.items():
+                f.write(b"\0" * (layout[name][1] - position))
+                f.write(np.ascontiguousarray(array).tobytes())
+                position = layout[name][1] + array.nbytes
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map a snapshot written by save(); nothing is read until queried."""
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(data[:len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a lineage graph snapshot")
+        header_length = int(data[len(SNAPSHOT_MAGIC):len(SNAPSHOT_MAGIC) + 8].view(np.uint64)[0])
+        start = len(SNAPSHOT_MAGIC) + 8
+        header = json.loads(bytes(data[start:start + header_length]))
+        if header["edge_types"] != EDGE_TYPES or header["labels"] != LABELS:
+            raise ValueError(f"{path} was written with different edge types or labels")
+        base = start + header_length
+
+        arrays = {}
+        for name, (dtype, offset, size) in header["arrays"].items():
+            dtype = np.dtype(dtype)
+            begin = base + offset
+            arrays[name] = data[begin:begin + size * dtype.itemsize].view(dtype)
+        return cls(arrays)
+
+    # --- Queries ---
+    def node_id(self, label, key):
+        """Interned id of a node, or None."""
+        wanted = f"{label}{KEY_SEPARATOR}{key}".encode("utf-8")
+        i = bisect_left(self._keys, wanted)
+        if i < self.node_count and self._keys[i] == wanted:
+            return i
+        return None
+
+    def node(self, node_id):
+        """(label, key) of an interned id."""
+        label, key = self._keys[node_id].decode("utf-8").split(KEY_SEPARATOR, 1)
+        return label, key
+
+    def find(self, label, prefix=""):
+        """Keys of `label` starting with `prefix`, e.g. every source of a Table location."""
+        wanted = f"{label}{KEY_SEPARATOR}{prefix}".encode("utf-8")
+        i = bisect_left(self._keys, wanted)
+        found = []
+        while i < self.node_count and self._keys[i].startswith(wanted):
+            found.append(self.node(i)[1])
+            i += 1
+        return found
+
+    def _walk(self, start, offsets, targets, types, edge_types, max_depth):
+        allowed = np.zeros(len(EDGE_TYPES), dtype=bool)
+        for edge_type in edge_types:
+            allowed[EDGE_TYPE_CODES[edge_type]] = True
+
+        distances = {start: 0}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            depth = distances[node]
+            if max_depth is not None and depth >= max_depth:
+                continue
+            begin, end = int(offsets[node]), int(offsets[node + 1])
+            if begin == end:
+                continue
+            neighbours = targets[begin:end][allowed[types[begin:end]]]
+            for neighbour in neighbours.tolist():
+                if neighbour not in distances:
+                    distances[neighbour] = depth + 1
+                    queue.append(neighbour)
+        del distances[start]
+        return distances
+
+    def _traverse(self, label, key, upstream, edge_types, max_depth):
+        start = self.node_id(label, key)
+        if start is None:
+            raise KeyError(f"{label} {key} is not in the graph")
+        if upstream:
+            found = self._walk(start, self.in_offsets, self.in_targets, self.in_types, edge_types, max_depth)
+        else:
+            found = self._walk(start, self.out_offsets, self.out_targets, self.out_types, edge_types, max_depth)
+        return [(*self.node(node_id), distance) for node_id, distance in found.items()]
+
+    def ancestors(self, label, key, edge_types=LINEAGE_EDGE_TYPES, max_depth=None):
+        """[(label, key, distance)] of every node upstream of (label, key)."""
+        return self._traverse(label, key, True, edge_types, max_depth)
+
+    def descendants(self, label, key, edge_types=LINEAGE_EDGE_TYPES, max_depth=None):
+        """[(label, key, distance)] of every node downstream of (label, key)."""
+        return self._traverse(label, key, False, edge_types, max_depth)
+
+
+def build_lineage_graph(dbt_connector=None, redshift_connector=None, redshift_columns_df=None):
+    """
+    Build a LineageGraph straight from a dbt project's manifest.json and/or a
+    Redshift catalog, without Neo4j. Every compiled dbt model is included,
+    whatever was imported before.
+    """
+    builder = LineageGraphBuilder()
+    if dbt_connector is not None:
+        for _, records in dbt_connector.iter_record_windows():
+            builder.add_dbt_records(records)
+    if redshift_connector is not None:
+        builder.add_redshift_records(redshift_connector.build_records(redshift_columns_df))
+    return builder.build()
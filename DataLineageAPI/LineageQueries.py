@@ -0,0 +1,185 @@
+import os
+import threading
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from Neo4jClient import Neo4jConnector
+
+load_dotenv()
+
+NEO4J_URI = os.getenv("NEO4J_URI")
+NEO4J_USERNAME = os.getenv("NEO4J_USERNAME")
+NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+
+# Cached query results kept in memory
+LINEAGE_QUERY_CACHE_SIZE = int(os.getenv("LINEAGE_QUERY_CACHE_SIZE", "1024"))
+# Upper bound on the traversal depth a caller may ask for
+LINEAGE_MAX_DEPTH = int(os.getenv("LINEAGE_MAX_DEPTH", "20"))
+
+# One breadth-first step per level and direction: the distinct nodes one hop away from
+# the `$frontier` keys. Expanding a frontier visits every node and edge once, where
+# matching variable-length paths enumerates every path (exponential on diamonds).
+# A table step is one Table -> DbtModel -> Table hop: a model reads the table as a
+# source (FEEDS_DATA_INTO) or depends on the model generating it (PROCEEDS_TO).
+LEVELS = {
+    "column": {
+        "key": ("id",),
+        "downstream": """
+            UNWIND $frontier AS key
+            MATCH (:Column {id: key.id})-[:TRANSFORMED_TO]->(n:Column)
+            RETURN DISTINCT n
+        """,
+        "upstream": """
+            UNWIND $frontier AS key
+            MATCH (:Column {id: key.id})<-[:TRANSFORMED_TO]-(n:Column)
+            RETURN DISTINCT n
+        """,
+    },
+    "model": {
+        "key": ("id",),
+        "downstream": """
+            UNWIND $frontier AS key
+            MATCH (:DbtModel {id: key.id})-[:PROCEEDS_TO]->(n:DbtModel)
+            RETURN DISTINCT n
+        """,
+        "upstream": """
+            UNWIND $frontier AS key
+            MATCH (:DbtModel {id: key.id})<-[:PROCEEDS_TO]-(n:DbtModel)
+            RETURN DISTINCT n
+        """,
+    },
+    "table": {
+        "key": ("name", "schema", "db_name"),
+        "downstream": """
+            UNWIND $frontier AS key
+            MATCH (t:Table {name: key.name, schema: key.schema, db_name: key.db_name})
+            CALL {
+                WITH t
+                MATCH (t)-[:FEEDS_DATA_INTO]->(m:DbtModel)
+                RETURN m
+                UNION
+                WITH t
+                MATCH (t)<-[:GENERATES]-(:DbtModel)-[:PROCEEDS_TO]->(m:DbtModel)
+                RETURN m
+            }
+            MATCH (m)-[:GENERATES]->(n:Table)
+            RETURN DISTINCT n
+        """,
+        "upstream": """
+            UNWIND $frontier AS key
+            MATCH (:Table {name: key.name, schema: key.schema, db_name: key.db_name})<-[:GENERATES]-(m:DbtModel)
+            CALL {
+                WITH m
+                MATCH (n:Table)-[:FEEDS_DATA_INTO]->(m)
+                RETURN n
+                UNION
+                WITH m
+                MATCH (n:Table)<-[:GENERATES]-(:DbtModel)-[:PROCEEDS_TO]->(m)
+                RETURN n
+            }
+            RETURN DISTINCT n
+        """,
+    },
+}
+
+
+class LineageQueryCache:
+    """
+    Bounded LRU cache of lineage query results.
+
+    Every entry is tagged with the generation it was computed in; invalidate()
+    starts a new generation (called whenever an import finishes), so results
+    computed before the import are never served again.
+    """
+    def __init__(self, maxsize=LINEAGE_QUERY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            generation = self.generation
+            entry = self._entries.get((generation, key))
+            if entry is not None:
+                self._entries.move_to_end((generation, key))
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            # Drop results computed while an import finished in the meantime
+            if generation == self.generation:
+                self._entries[(generation, key)] = value
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+class LineageQueryService(Neo4jConnector):
+    """Upstream/downstream traversals over the lineage graph, served through a LineageQueryCache."""
+    def __init__(self, neo4j_uri=NEO4J_URI, neo4j_user=NEO4J_USERNAME, neo4j_password=NEO4J_PASSWORD, cache=None):
+        super().__init__(neo4j_uri, neo4j_user, neo4j_password)
+        self.cache = cache or LineageQueryCache()
+
+    def traverse(self, level, direction, key, depth=3, skip=0, limit=100):
+        """
+        Return the nodes of `level` ("column", "model" or "table") reachable from
+        the start node within `depth` steps, nearest first, paginated.
+        `key` is {"id": ...} for columns/models and {"name", "schema", "db_name"} for tables.
+        At table level a step is one table-to-table hop through a dbt model.
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Unknown lineage level '{level}'")
+        if direction not in ("upstream", "downstream"):
+            raise ValueError(f"Unknown direction '{direction}'")
+        depth = max(1, min(int(depth), LINEAGE_MAX_DEPTH))
+        skip = max(0, int(skip))
+        limit = max(1, int(limit))
+
+        # The full ordered result is cached, so every page of a traversal is served from one entry
+        cache_key = (level, direction, tuple(sorted(key.items())), depth)
+        nodes = self.cache.get_or_compute(cache_key, lambda: self._traverse(level, direction, key, depth))
+        return {
+            "level": level,
+            "direction": direction,
+            "start": key,
+            "depth": depth,
+            "skip": skip,
+            "limit": limit,
+            "has_more": len(nodes) > skip + limit,
+            "results": list(nodes[skip:skip + limit]),
+        }
+
+    def _traverse(self, level, direction, key, depth):
+        spec = LEVELS[level]
+        node_key = lambda node: tuple(node.get(field) for field in spec["key"])
+        seen = {node_key(key)}
+        frontier = [key]
+        nodes = []
+        with self.driver.session() as session:
+            # Breadth first: every node is reported at the first distance it is reached
+            for distance in range(1, depth + 1):
+                next_frontier = []
+                for record in session.run(spec[direction], frontier=frontier):
+                    node = dict(record["n"])
+                    if node_key(node) in seen:
+                        continue
+                    seen.add(node_key(node))
+                    nodes.append({**node, "distance": distance})
+                    next_frontier.append({field: node.get(field) for field in spec["key"]})
+                if not next_frontier:
+                    break
+                frontier = next_frontier
+
+        nodes.sort(key=lambda node: (node["distance"], str(node.get("id") or node.get("name"))))
+        return tuple(nodes)
@@ -0,0 +1,157 @@
+import json
+
+try:
+    import ijson
+    from ijson.common import ObjectBuilder
+except ImportError:  # ijson is optional, fall back to json.load
+    ijson = None
+
+_fallback_warned = False
+
+
+def _load_json(path):
+    """json.load of the whole file, used when ijson is not installed (warns once)."""
+    global _fallback_warned
+    if not _fallback_warned:
+        _fallback_warned = True
+        print("⚠️ ijson is not installed, loading dbt artifacts whole into memory (pip install ijson)")
+    with open(path) as f:
+        return json.load(f)
+
+
+def _build_value(events, event, value):
+    """Build the JSON value that starts with (event, value) from the remaining events."""
+    builder = ObjectBuilder()
+    builder.event(event, value)
+    depth = 1 if event in ("start_map", "start_array") else 0
+    while depth:
+        _, event, value = next(events)
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+        builder.event(event, value)
+    return builder.value
+
+
+def _skip_value(events, event):
+    """Consume the events of a JSON value without building it."""
+    depth = 1 if event in ("start_map", "start_array") else 0
+    while depth:
+        _, event, _ = next(events)
+        if event in ("start_map", "start_array"):
+            depth += 1
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+
+
+# Top-level manifest section holding each resource type
+SECTIONS = {"model": "nodes", "source": "sources"}
+
+
+def iter_manifest_models(manifest_path, metadata=None):
+    """
+    Yield (model_id, node) for every model in a dbt manifest.json.
+
+    With ijson installed the file is streamed: only `metadata` and model
+    nodes are built as Python objects, while tests, seeds, macros, docs etc.
+    are skipped token by token, so memory stays flat whatever the manifest
+    size. The manifest `metadata` is copied into the `metadata` dict, which
+    is filled before the first model is yielded.
+    """
+    for _, node_id, node in iter_manifest_nodes(manifest_path, metadata, ("model",)):
+        yield node_id, node
+
+
+def iter_manifest_nodes(manifest_path, metadata=None, resource_types=("model", "source")):
+    """
+    Yield (resource_type, unique_id, node) for every node of `resource_types`
+    ("model" from `nodes`, "source" from `sources`) in one pass over the
+    manifest, streamed like iter_manifest_models.
+    """
+    if metadata is None:
+        metadata = {}
+    sections = {SECTIONS[resource_type]: resource_type for resource_type in resource_types}
+
+    if ijson is None:
+        manifest = _load_json(manifest_path)
+        metadata.update(manifest.get("metadata", {}))
+        for section, resource_type in sections.items():
+            for node_id, node in manifest.get(section, {}).items():
+                if node.get("resource_type", resource_type) == resource_type:
+                    yield resource_type, node_id, node
+        return
+
+    with open(manifest_path, "rb") as f:
+        events = ijson.parse(f, use_float=True)
+        for prefix, event, value in events:
+            if prefix != "" or event != "map_key":
+                continue
+
+            _, event, first = next(events)
+            if value == "metadata":
+                metadata.update(_build_value(events, event, first) or {})
+            elif value in sections and event == "start_map":
+                resource_type = sections[value]
+                for _, event, node_id in events:
+                    if event == "end_map":
+                        break
+                    _, event, first = next(events)
+                    if not node_id.startswith(f"{resource_type}."):
+                        _skip_value(events, event)
+                        continue
+                    node = _build_value(events, event, first)
+                    if node.get("resource_type", resource_type) == resource_type:
+                        yield resource_type, node_id, node
+            else:
+                _skip_value(events, event)
+
+
+def iter_catalog_tables(catalog_path):
+    """
+    Yield (unique_id, entry) for every relation of a dbt catalog.json (`nodes`
+    and `sources`), streamed like the manifest when ijson is installed.
+    """
+    sections = ("nodes", "sources")
+
+    if ijson is None:
+        catalog = _load_json(catalog_path)
+        for section in sections:
+            yield from catalog.get(section, {}).items()
+        return
+
+    with open(catalog_path, "rb") as f:
+        events = ijson.parse(f, use_float=True)
+        for prefix, event, value in events:
+            if prefix != "" or event != "map_key":
+                continue
+
+            _, event, first = next(events)
+            if value in sections and event == "start_map":
+                for _, event, unique_id in events:
+                    if event == "end_map":
+                        break
+                    _, event, first = next(events)
+                    yield unique_id, _build_value(events, event, first)
+            else:
+                _skip_value(events, event)
+
+
+def load_catalog_schema(catalog_path, relations=None):
+    """
+    Return {"db.schema.table": {column: data_type}} from a dbt catalog.json,
+    columns in table order. Identifiers are lowercased, as Redshift folds
+    unquoted identifiers. `relations`, when given, is filled with
+    {unique_id: "db.schema.table"}.
+    """
+    schema = {}
+    for unique_id, entry in iter_catalog_tables(catalog_path):
+        metadata = entry.get("metadata", {})
+        parts = (metadata.get("database"), metadata.get("schema"), metadata.get("name"))
+        if not all(parts):
+            continue
+        columns = sorted(entry.get("columns", {}).values(), key=lambda column: column.get("index") or 0)
+        schema[".".join(parts).lower()] = {column["name"].lower(): column.get("type") for column in columns}
+        if relations is not None:
+            relations[unique_id] = ".".join(parts).lower()
+    return schema
@@ -0,0 +1,229 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# When set, every import writes a JSON trace of its phases and counters here
+LINEAGE_TRACE_DIR = os.getenv("LINEAGE_TRACE_DIR")
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (f'{k}="{v}"'.replace("\n", "\\n") for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+class MetricsRegistry:
+    """Process-wide counters and duration histograms, rendered in the Prometheus text format."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}
+        self._histograms = {}
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, value=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            buckets, total, count = series.get(key, ([0] * len(DURATION_BUCKETS), 0.0, 0))
+            buckets = [b + (seconds <= bound) for b, bound in zip(buckets, DURATION_BUCKETS)]
+            series[key] = (buckets, total + seconds, count + 1)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, (buckets, total, count) in sorted(series.items()):
+                    for bound, value in zip(DURATION_BUCKETS, buckets):
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', str(bound))])} {value}")
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {total}")
+                    lines.append(f"{name}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+registry.describe("lineage_phase_seconds", "Time spent in each import phase.")
+registry.describe("lineage_rows_read_total", "Rows read from sources (manifest models, catalog rows).")
+registry.describe("lineage_statements_total", "Statements sent to Neo4j.")
+registry.describe("lineage_rows_written_total", "Rows sent to Neo4j in UNWIND batches.")
+registry.describe("lineage_nodes_created_total", "Nodes created in Neo4j.")
+registry.describe("lineage_relationships_created_total", "Relationships created in Neo4j.")
+registry.describe("lineage_parse_failures_total", "Compiled SQL statements sqlglot could not parse.")
+registry.describe("lineage_imports_total", "Finished imports by status.")
+
+
+class ImportTrace:
+    """Phase timings and counters of a single import, also added to the enclosing `parent` trace."""
+    def __init__(self, source, parent=None):
+        self.source = source
+        self.parent = parent
+        self.started_at = time.time()
+        self.spans = []
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, phase, started_at, seconds):
+        with self._lock:
+            self.spans.append({"phase": phase, "started_at": started_at, "seconds": round(seconds, 6)})
+        if self.parent is not None:
+            self.parent.add_span(phase, started_at, seconds)
+
+    def add(self, name, value):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        if self.parent is not None:
+            self.parent.add(name, value)
+
+    def summary(self):
+        """Total seconds per phase, in order of first appearance."""
+        totals = {}
+        for span in self.spans:
+            totals[span["phase"]] = totals.get(span["phase"], 0.0) + span["seconds"]
+        return totals
+
+    def to_dict(self):
+        return {
+            "source": self.source,
+            "started_at": self.started_at,
+            "phases": self.summary(),
+            "spans": self.spans,
+            "counters": self.counters,
+        }
+
+
+_current_trace = contextvars.ContextVar("lineage_import_trace", default=None)
+
+
+def current_source():
+    trace = _current_trace.get()
+    return trace.source if trace else None
+
+
+@contextmanager
+def import_trace(source, trace_dir=LINEAGE_TRACE_DIR):
+    """
+    Collect the spans and counters of one import. When `trace_dir` is set the
+    trace is written there as JSON once the import ends.
+    """
+    trace = ImportTrace(source, parent=_current_trace.get())
+    token = _current_trace.set(trace)
+    status = "failed"
+    try:
+        yield trace
+        status = "succeeded"
+    finally:
+        _current_trace.reset(token)
+        registry.inc("lineage_imports_total", source=source, status=status)
+        if trace_dir:
+            path = Path(trace_dir) / f"{source}-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}.json"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "w") as f:
+                json.dump({**trace.to_dict(), "status": status}, f, indent=2)
+
+
+@contextmanager
+def collect_trace(name):
+    """
+    Collect the spans and counters of everything run inside the block (e.g.
+    several imports of one CLI command) into one ImportTrace, without
+    counting it as an import.
+    """
+    trace = ImportTrace(name, parent=_current_trace.get())
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def traced(source):
+    """Decorator running the wrapped import method inside import_trace(source)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with import_trace(source):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def span(phase):
+    """Time a phase of the current import."""
+    started_at = time.time()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - started, started_at)
+
+
+def record_phase(phase, seconds, started_at=None):
+    registry.observe("lineage_phase_seconds", seconds, source=current_source(), phase=phase)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_span(phase, started_at or time.time() - seconds, seconds)
+
+
+def count(name, value=1):
+    """Increment counter `name` (e.g. lineage_rows_read_total) for the current import."""
+    if not value:
+        return
+    registry.inc(name, value, source=current_source())
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, value)
+
+
+def timed_iter(iterable, phase):
+    """Yield from `iterable`, recording the time spent producing items as one `phase` span."""
+    iterator = iter(iterable)
+    started_at = time.time()
+    elapsed = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - started
+            yield item
+    finally:
+        record_phase(phase, elapsed, started_at)
@@ -0,0 +1,434 @@
+import contextvars
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from neo4j import GraphDatabase
+from neo4j.exceptions import Neo4jError
+from dotenv import load_dotenv
+
+import Metrics
+
+load_dotenv()
+
+# Number of rows sent per UNWIND statement (the starting point when sizes adapt)
+NEO4J_BATCH_SIZE = int(os.getenv("NEO4J_BATCH_SIZE", "1000"))
+# Commit latency batch sizes adapt towards, and their bounds
+NEO4J_TARGET_COMMIT_SECONDS = float(os.getenv("NEO4J_TARGET_COMMIT_SECONDS", "2.0"))
+NEO4J_MIN_BATCH_SIZE = int(os.getenv("NEO4J_MIN_BATCH_SIZE", "10"))
+NEO4J_MAX_BATCH_SIZE = int(os.getenv("NEO4J_MAX_BATCH_SIZE", "50000"))
+# Clean commits after a memory error before batch sizes may grow again, 25% at a time
+NEO4J_BATCH_RECOVERY_COMMITS = int(os.getenv("NEO4J_BATCH_RECOVERY_COMMITS", "20"))
+# Directory of the checkpoint files that let an interrupted import resume
+IMPORT_CHECKPOINT_DIR = os.getenv("IMPORT_CHECKPOINT_DIR", str(Path.home() / ".cache" / "data_lineage" / "import_checkpoints"))
+# Sessions writing partitions of the same query concurrently (1 writes serially)
+NEO4J_WRITE_PARALLELISM = int(os.getenv("NEO4J_WRITE_PARALLELISM", "1"))
+# Retries of a chunk whose transaction keeps deadlocking after the driver's own retries
+NEO4J_DEADLOCK_RETRIES = int(os.getenv("NEO4J_DEADLOCK_RETRIES", "5"))
+
+# Errors raised when a transaction does not fit in the Neo4j heap / transaction memory limit
+MEMORY_ERROR_CODES = (
+    "Neo.TransientError.General.OutOfMemoryError",
+    "Neo.TransientError.General.MemoryPoolOutOfMemoryError",
+    "Neo.TransientError.General.TransactionMemoryLimit",
+)
+DEADLOCK_CODES = (
+    "Neo.TransientError.Transaction.DeadlockDetected",
+)
+
+
+# Constraints and indexes behind every MERGE / MATCH key used by the connectors:
+# (name, label, properties, statement)
+SCHEMA_STATEMENTS = [
+    ("column_id", "Column", ("id",),
+     "CREATE CONSTRAINT column_id IF NOT EXISTS FOR (c:Column) REQUIRE c.id IS UNIQUE"),
+    ("dbt_model_id", "DbtModel", ("id",),
+     "CREATE CONSTRAINT dbt_model_id IF NOT EXISTS FOR (m:DbtModel) REQUIRE m.id IS UNIQUE"),
+    # Makes concurrent MERGEs of one Table safe across imports and processes (Neo4j 5 composite constraint)
+    ("table_id", "Table", ("name", "schema", "db_name", "source"),
+     "CREATE CONSTRAINT table_id IF NOT EXISTS FOR (t:Table) REQUIRE (t.name, t.schema, t.db_name, t.source) IS UNIQUE"),
+    ("table_location", "Table", ("name", "schema", "db_name"),
+     "CREATE INDEX table_location IF NOT EXISTS FOR (t:Table) ON (t.name, t.schema, t.db_name)"),
+    ("column_location", "Column", ("name", "table_name", "schema"),
+     "CREATE INDEX column_location IF NOT EXISTS FOR (c:Column) ON (c.name, c.table_name, c.schema)"),
+    ("dbt_model_package", "DbtModel", ("package_name",),
+     "CREATE INDEX dbt_model_package IF NOT EXISTS FOR (m:DbtModel) ON (m.package_name)"),
+]
+
+
+# Run before SCHEMA_STATEMENTS: the Table key index blocks a constraint on the same properties
+OBSOLETE_SCHEMA_STATEMENTS = [
+    "DROP INDEX table_key IF EXISTS",
+]
+
+
+def ensure_schema(driver):
+    """Create the constraints and indexes the connectors rely on. Idempotent."""
+    with driver.session() as session:
+        for statement in OBSOLETE_SCHEMA_STATEMENTS:
+            session.run(statement).consume()
+        for _, _, _, statement in SCHEMA_STATEMENTS:
+            session.run(statement).consume()
+
+
+def missing_indexes(driver):
+    """Return the names of required indexes that do not exist or are not ONLINE."""
+    with driver.session() as session:
+        online = {
+            (tuple(record["labelsOrTypes"] or []), tuple(record["properties"] or []))
+            for record in session.run(
+                "SHOW INDEXES YIELD labelsOrTypes, properties, state WHERE state = 'ONLINE' "
+                "RETURN labelsOrTypes, properties"
+            )
+        }
+    return [
+        name for name, label, properties, _ in SCHEMA_STATEMENTS
+        if ((label,), properties) not in online
+    ]
+
+
+def check_schema(driver):
+    """Print a warning for every missing required index; never raises."""
+    try:
+        missing = missing_indexes(driver)
+    except Exception as e:
+        print(f"⚠️ Could not check Neo4j indexes: {e}")
+        return
+    if missing:
+        print(f"⚠️ Missing Neo4j indexes {missing}: MERGE/MATCH on these keys will scan all nodes of the label.")
+    else:
+        print("✅ All required Neo4j indexes are online.")
+
+
+_drivers = {}
+_bootstrapped = set()
+_drivers_lock = threading.Lock()
+
+
+def get_driver(uri, user, password):
+    """
+    Return the process-wide Neo4j driver for this uri/user, creating it on first use.
+    The driver keeps its own connection pool and is safe to share across threads.
+    The graph schema (SCHEMA_STATEMENTS) is bootstrapped the first time a driver
+    connects, and again on every call until that succeeds.
+    """
+    key = (uri, user)
+    with _drivers_lock:
+        driver = _drivers.get(key)
+        if driver is None:
+            driver = GraphDatabase.driver(uri, auth=(user, password))
+            _drivers[key] = driver
+        if key not in _bootstrapped:
+            try:
+                ensure_schema(driver)
+                _bootstrapped.add(key)
+            except Exception as e:
+                # Retried on next use; the write itself will surface a real connection problem
+                print(f"⚠️ Could not create Neo4j constraints/indexes: {e}")
+        return driver
+
+
+def close_drivers():
+    """Close every shared driver (e.g. on API shutdown)."""
+    with _drivers_lock:
+        for driver in _drivers.values():
+            driver.close()
+        _drivers.clear()
+        _bootstrapped.clear()
+
+
+class Neo4jConnector:
+    """Base class for connectors writing to Neo4j through the shared, lazily created driver."""
+    def __init__(self, neo4j_uri, neo4j_user, neo4j_password):
+        self.neo4j_auth = (neo4j_uri, neo4j_user, neo4j_password)
+        self._driver = None
+
+    @property
+    def driver(self):
+        # Not cached here, so get_driver retries a failed schema bootstrap before the next writes
+        return self._driver if self._driver is not None else get_driver(*self.neo4j_auth)
+
+    @driver.setter
+    def driver(self, driver):
+        self._driver = driver
+
+
+def chunked(rows, size):
+    """Yield successive slices of `rows` containing at most `size` items."""
+    rows = list(rows)
+    size = max(int(size), 1)
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def is_memory_error(error):
+    return isinstance(error, Neo4jError) and getattr(error, "code", None) in MEMORY_ERROR_CODES
+
+
+def is_deadlock(error):
+    return isinstance(error, Neo4jError) and getattr(error, "code", None) in DEADLOCK_CODES
+
+
+def partition_rows(rows, key, partitions):
+    """
+    Split `rows` into `partitions` lists by a stable hash of `key(row)`, keeping
+    their order, so every row of one node key lands in the same partition.
+    """
+    parts = [[] for _ in range(partitions)]
+    for row in rows:
+        parts[zlib.crc32(repr(key(row)).encode("utf-8")) % partitions].append(row)
+    return parts
+
+
+class _BatchTooLarge(Exception):
+    """Raised inside a transaction function so the driver does not retry an oversized batch as is."""
+
+
+class AdaptiveBatchSize:
+    """
+    Rows per transaction, adapted after every commit: moves towards the size
+    that would commit in `target_seconds` at the observed row rate (at most
+    doubling at a time) and halves when Neo4j runs out of memory. After a
+    memory error the halved size is a ceiling, raised by 25% only after
+    `recovery_commits` clean commits and never up to a size that failed.
+    """
+    def __init__(self, size=NEO4J_BATCH_SIZE, min_size=NEO4J_MIN_BATCH_SIZE, max_size=NEO4J_MAX_BATCH_SIZE,
+                 target_seconds=NEO4J_TARGET_COMMIT_SECONDS, recovery_commits=NEO4J_BATCH_RECOVERY_COMMITS):
+        self.min_size = max(1, min(min_size, size))
+        self.max_size = max(max_size, size)
+        self.target_seconds = target_seconds
+        self.recovery_commits = recovery_commits
+        self.size = max(1, int(size))
+        self.ceiling = self.max_size
+        self.clean_commits = 0
+
+    def observe(self, rows, seconds):
+        if self.ceiling < self.max_size:
+            self.clean_commits += 1
+            if self.clean_commits >= self.recovery_commits:
+                self.ceiling = min(self.max_size, self.ceiling + max(1, self.ceiling // 4))
+                self.clean_commits = 0
+        if rows < self.size and seconds <= self.target_seconds:
+            # A short final chunk says nothing about larger ones
+            return
+        ideal = rows / max(seconds, 1e-3) * self.target_seconds
+        size = min(int((self.size + ideal) / 2), self.size * 2)
+        self.size = max(self.min_size, min(self.ceiling, size))
+
+    def shrink(self, rows):
+        """Halve the size after a memory error on `rows` rows; False when it cannot shrink any further."""
+        if rows <= 1:
+            return False
+        self.size = max(1, rows // 2)
+        self.min_size = min(self.min_size, self.size)
+        self.max_size = max(self.size, min(self.max_size, rows - 1))
+        self.ceiling = self.size
+        self.clean_commits = 0
+        return True
+
+
+class ImportCheckpoint:
+    """
+    Ordered record of the write steps of an import and the rows each one has
+    committed, saved to a JSON file after every committed chunk.
+
+    A step is identified by its query and the exact rows it writes. A restarted
+    import skips the committed rows of its steps for as long as it repeats the
+    recorded sequence; from the first step that differs, everything recorded
+    after it is discarded and written again. Steps written in partitions keep
+    one count per partition. Deleted once the import completes.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.steps = []
+        self.snapshots = {}
+        self.position = 0
+        self._lock = threading.Lock()
+        if self.path.exists():
+            try:
+                with open(self.path) as f:
+                    saved = json.load(f)
+                self.steps = saved.get("steps", [])
+                self.snapshots = saved.get("snapshots", {})
+            except json.JSONDecodeError:
+                pass
+
+    @classmethod
+    def for_name(cls, name, checkpoint_dir=None):
+        safe = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in name)
+        return cls(Path(checkpoint_dir or IMPORT_CHECKPOINT_DIR) / f"{safe}.json")
+
+    @staticmethod
+    def step_key(query, rows):
+        digest = hashlib.sha256(query.encode("utf-8"))
+        digest.update(json.dumps(rows, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    def snapshot(self, name, load):
+        """
+        Return `load()`, or the value it returned when the interrupted import
+        started, so a resumed import plans the same steps from the same state.
+        """
+        if name not in self.snapshots:
+            self.snapshots[name] = load()
+        return self.snapshots[name]
+
+    def begin(self, key, partitions=None):
+        """
+        Start the next step; return the number of its rows already committed,
+        or a list of counts when it is written in `partitions` partitions.
+        """
+        if partitions is not None:
+            key = f"{key}:{partitions}"
+        if self.position < len(self.steps) and self.steps[self.position][0] == key:
+            committed = self.steps[self.position][1]
+            return list(committed) if partitions is not None else committed
+        del self.steps[self.position:]
+        self.steps.append([key, 0 if partitions is None else [0] * partitions])
+        return list(self.steps[-1][1]) if partitions is not None else 0
+
+    def advance(self, rows, partition=None):
+        """Record `rows` committed rows of the current step (or of one of its partitions)."""
+        with self._lock:
+            if partition is None:
+                self.steps[self.position][1] = rows
+            else:
+                self.steps[self.position][1][partition] = rows
+            self._save()
+
+    def end(self):
+        self.position += 1
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"steps": self.steps, "snapshots": self.snapshots}, f, default=str)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.steps = []
+        self.snapshots = {}
+        self.position = 0
+        self.path.unlink(missing_ok=True)
+
+
+class BatchWriter:
+    """
+    Writes `UNWIND $rows AS row ...` queries in chunked transactions, sized by
+    an AdaptiveBatchSize shared by every query of an import, recording each
+    committed chunk in an optional ImportCheckpoint.
+
+    With `parallelism` > 1, queries listed in `partition_keys` ({query: row ->
+    key of the node it MERGEs}) are split by that key and the partitions are
+    written concurrently, each through its own session of `driver`. A node key
+    only ever lands in one partition, in row order, so the graph is the same as
+    a serial run; write() returns once every partition is done, so writing node
+    queries before edge queries guarantees edges find their endpoints.
+    Chunks that keep deadlocking are retried with a randomised backoff.
+    """
+    def __init__(self, session, batch_size=NEO4J_BATCH_SIZE, progress=None, checkpoint=None,
+                 driver=None, parallelism=1, partition_keys=None, deadlock_retries=NEO4J_DEADLOCK_RETRIES):
+        self.session = session
+        self.batch_size = batch_size if isinstance(batch_size, AdaptiveBatchSize) else AdaptiveBatchSize(batch_size)
+        self.progress = progress
+        self.checkpoint = checkpoint
+        self.driver = driver
+        self.parallelism = max(1, int(parallelism)) if driver is not None else 1
+        self.partition_keys = partition_keys or {}
+        self.deadlock_retries = deadlock_retries
+
+    def write(self, query, rows):
+        rows = list(rows)
+        if not rows:
+            return
+
+        checkpoint = self.checkpoint
+        key = self.partition_keys.get(query)
+        if self.parallelism == 1 or key is None:
+            start = checkpoint.begin(checkpoint.step_key(query, rows)) if checkpoint is not None else 0
+            self._write_rows(self.session, query, rows, start, checkpoint.advance if checkpoint is not None else None)
+        else:
+            parts = partition_rows(rows, key, self.parallelism)
+            if checkpoint is not None:
+                starts = checkpoint.begin(checkpoint.step_key(query, rows), self.parallelism)
+            else:
+                starts = [0] * self.parallelism
+
+            def write_part(i):
+                def advance(committed):
+                    checkpoint.advance(committed, partition=i)
+
+                with self.driver.session() as session:
+                    self._write_rows(session, query, parts[i], starts[i], advance if checkpoint is not None else None)
+
+            with ThreadPoolExecutor(max_workers=self.parallelism) as executor:
+                # Each partition runs in a copy of the caller's context, so metrics reach its import trace
+                futures = [
+                    executor.submit(contextvars.copy_context().run, write_part, i)
+                    for i in range(self.parallelism) if starts[i] < len(parts[i])
+                ]
+                for future in futures:
+                    future.result()
+
+        if checkpoint is not None:
+            checkpoint.end()
+
+    def _write_rows(self, session, query, rows, start, advance=None):
+        """Write rows[start:] through `session`; `advance(committed rows)` after every commit."""
+        def run_batch(tx, batch):
+            try:
+                return tx.run(query, rows=batch).consume()
+            except Neo4jError as e:
+                if is_memory_error(e):
+                    raise _BatchTooLarge() from e
+                raise
+
+        if start and self.progress is not None:
+            self.progress.count("rows_resumed", start)
+
+        deadlocks = 0
+        while start < len(rows):
+            batch = rows[start:start + self.batch_size.size]
+            started = time.perf_counter()
+            try:
+                summary = session.execute_write(run_batch, batch)
+            except (_BatchTooLarge, Neo4jError) as e:
+                if is_deadlock(e) and deadlocks < self.deadlock_retries:
+                    deadlocks += 1
+                    print(f"⚠️ Deadlock writing {len(batch)} rows, retry {deadlocks}/{self.deadlock_retries}")
+                    time.sleep(random.uniform(0, 0.1 * 2 ** deadlocks))
+                    continue
+                if not (isinstance(e, _BatchTooLarge) or is_memory_error(e)) or not self.batch_size.shrink(len(batch)):
+                    raise
+                print(f"⚠️ Neo4j ran out of memory on {len(batch)} rows, retrying with {self.batch_size.size}")
+                continue
+            deadlocks = 0
+            self.batch_size.observe(len(batch), time.perf_counter() - started)
+            start += len(batch)
+            if advance is not None:
+                advance(start)
+
+            Metrics.count("lineage_statements_total")
+            Metrics.count("lineage_rows_written_total", len(batch))
+            counters = getattr(summary, "counters", None)
+            if counters is not None:
+                Metrics.count("lineage_nodes_created_total", counters.nodes_created)
+                Metrics.count("lineage_relationships_created_total", counters.relationships_created)
+            if self.progress is not None:
+                self.progress.count("rows_written", len(batch))
+
+
+def write_batches(session, query, rows, batch_size=NEO4J_BATCH_SIZE, progress=None):
+    """
+    Run a parameterised `UNWIND $rows AS row ...` query over `rows`,
+    one write transaction per chunk, starting at `batch_size` rows and
+    adapting to commit latency (see BatchWriter).
+    """
+    BatchWriter(session, batch_size, progress).write(query, rows)
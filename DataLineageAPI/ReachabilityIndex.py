@@ -0,0 +1,476 @@
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+
+from LineageGraph import KEY_SEPARATOR
+
+load_dotenv()
+
+# Sidecar file of the reachability index; the index is disabled when unset
+REACHABILITY_INDEX_PATH = os.getenv("REACHABILITY_INDEX_PATH")
+
+# Relationships indexed at each level, all pointing downstream:
+# column: Column -TRANSFORMED_TO-> Column
+# model:  Table -FEEDS_DATA_INTO-> DbtModel -PROCEEDS_TO-> DbtModel -GENERATES-> Table
+LEVELS = ("column", "model")
+
+# Edges read from Neo4j by rebuild_from_neo4j, as (level, query returning source/target keys)
+REBUILD_QUERIES = [
+    ("column", """
+        MATCH (a:Column)-[:TRANSFORMED_TO]->(b:Column)
+        RETURN a.id AS source, b.id AS target
+    """),
+    ("model", """
+        MATCH (a:DbtModel)-[:PROCEEDS_TO]->(b:DbtModel)
+        RETURN 'DbtModel' + $separator + a.id AS source, 'DbtModel' + $separator + b.id AS target
+    """),
+    ("model", """
+        MATCH (t:Table)-[:FEEDS_DATA_INTO]->(m:DbtModel)
+        RETURN 'Table' + $separator + t.db_name + '.' + t.schema + '.' + t.name AS source,
+               'DbtModel' + $separator + m.id AS target
+    """),
+    ("model", """
+        MATCH (m:DbtModel)-[:GENERATES]->(t:Table)
+        RETURN 'DbtModel' + $separator + m.id AS source,
+               'Table' + $separator + t.db_name + '.' + t.schema + '.' + t.name AS target
+    """),
+]
+
+
+def model_key(model_id):
+    return f"DbtModel{KEY_SEPARATOR}{model_id}"
+
+
+def table_location_key(db_name, schema, name):
+    """Tables are keyed by location only, like the FEEDS_DATA_INTO MATCH."""
+    return f"Table{KEY_SEPARATOR}{db_name}.{schema}.{name}"
+
+
+def column_table(column_id):
+    """`db.schema.table` of a `db.schema.table.column` id."""
+    return column_id.rsplit(".", 1)[0]
+
+
+class TransitiveClosure:
+    """
+    Direct edges and the full descendant / ancestor sets of every node of one
+    graph, so reachability is a set lookup.
+
+    Added edges extend the closure of the affected ancestors and descendants
+    only. Removed edges recompute the descendants of the nodes that could reach
+    them, reusing the (unchanged) closure of every node that could not.
+    """
+    def __init__(self):
+        self.ids = {}
+        self.keys = []
+        self.succ = []
+        self.pred = []
+        self.desc = []
+        self.anc = []
+        self._free = []
+
+    def node(self, key):
+        node_id = self.ids.get(key)
+        if node_id is None:
+            if self._free:
+                node_id = self._free.pop()
+                self.keys[node_id] = key
+            else:
+                node_id = len(self.keys)
+                self.keys.append(key)
+                for sets in (self.succ, self.pred, self.desc, self.anc):
+                    sets.append(set())
+            self.ids[key] = node_id
+        return node_id
+
+    @classmethod
+    def from_edges(cls, edges):
+        """Build the closure of a whole graph at once, one strongly connected component at a time."""
+        closure = cls()
+        for source, target in edges:
+            u, v = closure.node(source), closure.node(target)
+            closure.succ[u].add(v)
+            closure.pred[v].add(u)
+
+        # Tarjan (iterative) emits components sinks first, so successors are always done
+        n = len(closure.keys)
+        index, low, component = [None] * n, [0] * n, [None] * n
+        stack, on_stack, counter = [], [False] * n, 0
+        for root in range(n):
+            if index[root] is not None:
+                continue
+            work = [(root, iter(closure.succ[root]))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            while work:
+                node, successors = work[-1]
+                for s in successors:
+                    if index[s] is None:
+                        index[s] = low[s] = counter
+                        counter += 1
+                        stack.append(s)
+                        on_stack[s] = True
+                        work.append((s, iter(closure.succ[s])))
+                        break
+                    if on_stack[s]:
+                        low[node] = min(low[node], index[s])
+                else:
+                    work.pop()
+                    if work:
+                        low[work[-1][0]] = min(low[work[-1][0]], low[node])
+                    if low[node] == index[node]:
+                        members = []
+                        while True:
+                            member = stack.pop()
+                            on_stack[member] = False
+                            component[member] = node
+                            members.append(member)
+                            if member == node:
+                                break
+                        closure._close_component(members, component)
+
+        for node_id, targets in enumerate(closure.desc):
+            for target in targets:
+                closure.anc[target].add(node_id)
+        return closure
+
+    def _close_component(self, members, component):
+        reach = set()
+        cyclic = len(members) > 1
+        for member in members:
+            for s in self.succ[member]:
+                if component[s] == component[member]:
+                    cyclic = True
+                elif s not in reach:
+                    reach.add(s)
+                    reach |= self.desc[s]
+        if cyclic:
+            reach.update(members)
+        for member in members:
+            self.desc[member] = set(reach)
+
+    def add_edges(self, edges):
+        for source, target in edges:
+            u, v = self.node(source), self.node(target)
+            if v in self.succ[u]:
+                continue
+            self.succ[u].add(v)
+            self.pred[v].add(u)
+            if v in self.desc[u]:
+                continue
+            targets = self.desc[v] | {v}
+            for a in self.anc[u] | {u}:
+                new = targets - self.desc[a]
+                if new:
+                    self.desc[a] |= new
+                    for d in new:
+                        self.anc[d].add(a)
+
+    def remove_edges(self, edges):
+        removed = []
+        for source, target in edges:
+            u, v = self.ids.get(source), self.ids.get(target)
+            if u is not None and v is not None and v in self.succ[u]:
+                removed.append((u, v))
+        if not removed:
+            return
+
+        # Only nodes that reached a removed edge can lose descendants
+        affected = set()
+        for u, _ in removed:
+            affected |= self.anc[u]
+            affected.add(u)
+        for u, v in removed:
+            self.succ[u].discard(v)
+            self.pred[v].discard(u)
+
+        new_desc = {node: self._reach(node, affected) for node in affected}
+        for node, reach in new_desc.items():
+            for lost in self.desc[node] - reach:
+                self.anc[lost].discard(node)
+            self.desc[node] = reach
+
+    def _reach(self, start, affected):
+        reach = set()
+        stack = list(self.succ[start])
+        while stack:
+            node = stack.pop()
+            if node in reach:
+                continue
+            reach.add(node)
+            if node in affected:
+                stack.extend(self.succ[node])
+            else:
+                # Could not reach a removed edge: its closure is still exact
+                reach |= self.desc[node]
+        return reach
+
+    def edges_into(self, keys):
+        edges = []
+        for key in keys:
+            v = self.ids.get(key)
+            if v is not None:
+                edges.extend((self.keys[u], key) for u in self.pred[v])
+        return edges
+
+    def edges_from(self, keys):
+        edges = []
+        for key in keys:
+            u = self.ids.get(key)
+            if u is not None:
+                edges.extend((key, self.keys[v]) for v in self.succ[u])
+        return edges
+
+    def remove_nodes(self, keys):
+        keys = [key for key in keys if key in self.ids]
+        self.remove_edges(self.edges_into(keys) + self.edges_from(keys))
+        for key in keys:
+            node_id = self.ids.pop(key)
+            self.keys[node_id] = None
+            self._free.append(node_id)
+
+    def descendants(self, key):
+        node_id = self.ids.get(key)
+        return [] if node_id is None else [self.keys[d] for d in self.desc[node_id] if d != node_id]
+
+    def ancestors(self, key):
+        node_id = self.ids.get(key)
+        return [] if node_id is None else [self.keys[a] for a in self.anc[node_id] if a != node_id]
+
+    def reaches(self, source, target):
+        u, v = self.ids.get(source), self.ids.get(target)
+        return u is not None and v is not None and v in self.desc[u]
+
+    @property
+    def edge_count(self):
+        return sum(len(s) for s in self.succ)
+
+    @property
+    def closure_size(self):
+        return sum(len(s) for s in self.desc)
+
+    # --- Persistence ---
+    def to_arrays(self):
+        """Live keys, direct edges and descendant sets as compact arrays (ids renumbered densely)."""
+        live = [node_id for node_id, key in enumerate(self.keys) if key is not None]
+        remap = {node_id: i for i, node_id in enumerate(live)}
+        encoded = [self.keys[node_id].encode("utf-8") for node_id in live]
+        key_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(k) for k in encoded], out=key_offsets[1:])
+
+        def csr(sets):
+            offsets = np.zeros(len(live) + 1, dtype=np.int64)
+            np.cumsum([len(sets[node_id]) for node_id in live], out=offsets[1:])
+            targets = np.fromiter(
+                (remap[t] for node_id in live for t in sets[node_id]), dtype=np.int32, count=int(offsets[-1])
+            )
+            return offsets, targets
+
+        succ_offsets, succ_targets = csr(self.succ)
+        desc_offsets, desc_targets = csr(self.desc)
+        return {
+            "key_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "key_offsets": key_offsets,
+            "succ_offsets": succ_offsets,
+            "succ_targets": succ_targets,
+            "desc_offsets": desc_offsets,
+            "desc_targets": desc_targets,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        closure = cls()
+        blob = arrays["key_blob"].tobytes()
+        key_offsets = arrays["key_offsets"].tolist()
+        closure.keys = [blob[key_offsets[i]:key_offsets[i + 1]].decode("utf-8") for i in range(len(key_offsets) - 1)]
+        closure.ids = {key: i for i, key in enumerate(closure.keys)}
+
+        def sets(offsets, targets):
+            offsets, targets = offsets.tolist(), targets.tolist()
+            return [set(targets[offsets[i]:offsets[i + 1]]) for i in range(len(offsets) - 1)]
+
+        closure.succ = sets(arrays["succ_offsets"], arrays["succ_targets"])
+        closure.desc = sets(arrays["desc_offsets"], arrays["desc_targets"])
+        closure.pred = [set() for _ in closure.keys]
+        closure.anc = [set() for _ in closure.keys]
+        for node_id, targets in enumerate(closure.succ):
+            for target in targets:
+                closure.pred[target].add(node_id)
+        for node_id, targets in enumerate(closure.desc):
+            for target in targets:
+                closure.anc[target].add(node_id)
+        return closure
+
+
+class ReachabilityIndex:
+    """
+    Precomputed ancestor / descendant sets of every Column (over TRANSFORMED_TO)
+    and every DbtModel and Table (over FEEDS_DATA_INTO, PROCEEDS_TO and
+    GENERATES), kept in a sidecar file next to Neo4j.
+
+    The connectors apply the same changes they write to Neo4j (the lineage
+    cleared and rewritten for changed models, deleted models and columns,
+    mined query lineage), so impact checks are lookups instead of
+    variable-length traversals. rebuild_from_neo4j() builds it from scratch.
+    """
+    def __init__(self, path=REACHABILITY_INDEX_PATH):
+        self.path = Path(path) if path else None
+        self.levels = {level: TransitiveClosure() for level in LEVELS}
+        # db.schema.table -> ids of its Column nodes, to clear lineage by table
+        self.table_columns = {}
+        self._lock = threading.RLock()
+        if self.path is not None and self.path.exists():
+            self.load()
+
+    # --- Updates mirroring the connector writes ---
+    def _add_columns(self, column_ids):
+        for column_id in column_ids:
+            self.table_columns.setdefault(column_table(column_id), set()).add(column_id)
+
+    def add_column_records(self, records):
+        """TRANSFORMED_TO of build_records / build_query_lineage_records output."""
+        with self._lock:
+            edges = [(rel["source_id"], rel["target_id"]) for rel in records["transformed_to"]]
+            self._add_columns(c["id"] for c in records["columns"])
+            self._add_columns(column_id for edge in edges for column_id in edge)
+            self.levels["column"].add_edges(edges)
+
+    def add_dbt_records(self, records):
+        with self._lock:
+            self.levels["model"].add_edges(
+                [(table_location_key(rel["db_name"], rel["schema_name"], rel["table_name"]), model_key(rel["model_id"]))
+                 for rel in records["model_sources"]]
+                + [(model_key(rel["model_id"]), table_location_key(rel["db_name"], rel["schema_name"], rel["table_name"]))
+                   for rel in records["generates"]]
+            )
+            self.add_column_records(records)
+
+    def add_model_dependencies(self, rows):
+        """PROCEEDS_TO rows ({"model_id", "depends_on_id"})."""
+        with self._lock:
+            self.levels["model"].add_edges((model_key(row["depends_on_id"]), model_key(row["model_id"])) for row in rows)
+
+    def add_cross_project_feeds(self, rows):
+        """FEEDS_DATA_INTO from the tables a producer model generates to a consumer model of another project."""
+        with self._lock:
+            model = self.levels["model"]
+            edges = []
+            for row in rows:
+                for _, table in model.edges_from([model_key(row["producer_id"])]):
+                    if table.startswith(f"Table{KEY_SEPARATOR}"):
+                        edges.append((table, model_key(row["consumer_id"])))
+            model.add_edges(edges)
+
+    def clear_model_lineage(self, rows):
+        """Like MODEL_LINEAGE_CLEANUP_QUERIES: inputs, generated tables and lineage into the model's columns."""
+        with self._lock:
+            model = self.levels["model"]
+            keys = [model_key(row["model_id"]) for row in rows]
+            generates = [edge for edge in model.edges_from(keys) if edge[1].startswith(f"Table{KEY_SEPARATOR}")]
+            model.remove_edges(model.edges_into(keys) + generates)
+
+            columns = set()
+            for row in rows:
+                columns |= self.table_columns.get(f"{row['database']}.{row['schema']}.{row['table_name']}", set())
+            self.levels["column"].remove_edges(self.levels["column"].edges_into(columns))
+
+    def delete_models(self, rows):
+        with self._lock:
+            self.levels["model"].remove_nodes([model_key(row["model_id"]) for row in rows])
+
+    # --- Lookups ---
+    def _level_key(self, level, key):
+        if level not in self.levels:
+            raise ValueError(f"Unknown reachability level '{level}'")
+        return self.levels[level], key
+
+    def descendants(self, level, key):
+        with self._lock:
+            closure, key = self._level_key(level, key)
+            return sorted(closure.descendants(key))
+
+    def ancestors(self, level, key):
+        with self._lock:
+            closure, key = self._level_key(level, key)
+            return sorted(closure.ancestors(key))
+
+    def reaches(self, level, source, target):
+        """True when `target` is downstream of `source`."""
+        with self._lock:
+            closure, source = self._level_key(level, source)
+            return closure.reaches(source, target)
+
+    def table_impact(self, db_name, schema, name):
+        """Models and columns downstream of a table, i.e. everything affected by dropping it."""
+        with self._lock:
+            downstream = self.levels["model"].descendants(table_location_key(db_name, schema, name))
+            columns = set()
+            for column_id in self.table_columns.get(f"{db_name}.{schema}.{name}", set()):
+                columns.update(self.levels["column"].descendants(column_id))
+            prefix = f"DbtModel{KEY_SEPARATOR}"
+            return {
+                "models": sorted(key[len(prefix):] for key in downstream if key.startswith(prefix)),
+                "columns": sorted(columns),
+            }
+
+    def stats(self):
+        with self._lock:
+            return {
+                level: {"nodes": len(closure.ids), "edges": closure.edge_count, "closure": closure.closure_size}
+                for level, closure in self.levels.items()
+            }
+
+    # --- Persistence ---
+    def save(self):
+        """Write the sidecar file (then rename, so readers never see a partial file)."""
+        if self.path is None:
+            return
+        with self._lock:
+            arrays = {
+                f"{level}_{name}": array
+                for level, closure in self.levels.items()
+                for name, array in closure.to_arrays().items()
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        with np.load(self.path) as data:
+            levels = {
+                level: TransitiveClosure.from_arrays({
+                    name[len(level) + 1:]: data[name] for name in data.files if name.startswith(f"{level}_")
+                })
+                for level in LEVELS
+            }
+        table_columns = {}
+        for column_id in levels["column"].ids:
+            table_columns.setdefault(column_table(column_id), set()).add(column_id)
+        with self._lock:
+            self.levels = levels
+            self.table_columns = table_columns
+
+    def rebuild_from_neo4j(self, driver):
+        """Replace the index with the lineage currently in Neo4j and save it."""
+        edges = {level: [] for level in LEVELS}
+        with driver.session() as session:
+            for level, query in REBUILD_QUERIES:
+                edges[level].extend(
+                    (record["source"], record["target"]) for record in session.run(query, separator=KEY_SEPARATOR)
+                )
+        levels = {level: TransitiveClosure.from_edges(edges[level]) for level in LEVELS}
+        table_columns = {}
+        for column_id in levels["column"].ids:
+            table_columns.setdefault(column_table(column_id), set()).add(column_id)
+        with self._lock:
+            self.levels = levels
+            self.table_columns = table_columns
+        self.save()
+        print(f"✅ Rebuilt reachability index: {self.stats()}")
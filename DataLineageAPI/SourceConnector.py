@@ -1,18 +1,27 @@
+import hashlib
 import json
 import subprocess
+from collections import deque
+from datetime import datetime
 from pathlib import Path
-from neo4j import GraphDatabase
-
-import sqlglot
-from sqlglot import parse_one, exp
 
 import boto3
-import psycopg2
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+import threading
 
 import os
 from dotenv import load_dotenv
 
+import Metrics
+from ImportJobs import ImportProgress
+from ManifestReader import iter_manifest_models, load_catalog_schema
+from Neo4jClient import NEO4J_BATCH_SIZE, NEO4J_WRITE_PARALLELISM, BatchWriter, ImportCheckpoint, Neo4jConnector, write_batches
+from SqlLineage import (LINEAGE_CACHE_DIR, LINEAGE_RESOLVER_VERSION, LINEAGE_WORKERS, LineagePool, extract_lineage_batch,
+                        extract_write_lineage, schema_digest, sql_hash)
+
 load_dotenv()
 
 # Import sensitive information
@@ -30,331 +39,732 @@ RED_SHIFT_DBNAME = os.getenv("RED_SHIFT_DBNAME")
 RED_SHIFT_USER = os.getenv("RED_SHIFT_USER")
 RED_SHIFT_PASSWORD = os.getenv("RED_SHIFT_PASSWORD")
 RED_SHIFT_SCHEMA = os.getenv("RED_SHIFT_SCHEMA")
+RED_SHIFT_PORT = int(os.getenv("RED_SHIFT_PORT", "5439"))
+# "information_schema" or "pg_catalog"
+RED_SHIFT_EXTRACTOR = os.getenv("RED_SHIFT_EXTRACTOR", "information_schema")
+# Schemas extracted concurrently (one pooled connection each)
+RED_SHIFT_WORKERS = int(os.getenv("RED_SHIFT_WORKERS", "4"))
+# Rows per chunk turned into a DataFrame (catalog) or parsed together (query history)
+RED_SHIFT_FETCH_SIZE = int(os.getenv("RED_SHIFT_FETCH_SIZE", "10000"))
+# Query history mined for INSERT ... SELECT / CTAS lineage (SYS_QUERY_HISTORY layout)
+RED_SHIFT_QUERY_HISTORY_TABLE = os.getenv("RED_SHIFT_QUERY_HISTORY_TABLE", "sys_query_history")
+# File keeping the last mined (end_time, query_id) and recently seen statement hashes
+RED_SHIFT_QUERY_WATERMARK = os.getenv("RED_SHIFT_QUERY_WATERMARK", "redshift_query_watermark.json")
+# Statement hashes remembered across runs to skip re-runs of the same ETL statement
+RED_SHIFT_QUERY_HASH_HISTORY = int(os.getenv("RED_SHIFT_QUERY_HASH_HISTORY", "100000"))
+# search_path schema assumed for unqualified table names in mined queries
+RED_SHIFT_DEFAULT_SCHEMA = os.getenv("RED_SHIFT_DEFAULT_SCHEMA", "public")
 
-def safe_name(part):
-    """Return cleaned identifier whether it's a string or AST node."""
-    if part is None:
-        return None
-    if hasattr(part, "sql"):
-        return part.sql().replace('"', '')
-    return str(part).replace('"', '')
+# Number of manifest models parsed and written together while streaming
+DBT_MODEL_WINDOW = int(os.getenv("DBT_MODEL_WINDOW", "500"))
+# Directory holding a saved manifest.json to compare against for state:modified+ / --defer
+DBT_STATE_PATH = os.getenv("DBT_STATE_PATH")
+# Lines of dbt output kept for the error raised when a compile fails
+DBT_LOG_TAIL = 50
 
+# --- Batched (UNWIND) dbt model writes ---
+DBT_MODELS_QUERY = """
+    UNWIND $rows AS row
+    MERGE (model:DbtModel {id: row.model_id})
+    SET model.name = row.model_name,
+        model.description = row.description,
+        model.tags = row.tags,
+        model.materialized = row.materialized,
+        model.package_name = row.package_name,
+        model.database = row.database,
+        model.schema = row.schema
+"""
 
-def extract_source_from_sql(sql):
-    ast = parse_one(sql)
+# Written once the whole import is done, so an interrupted import never marks a model up to date.
+# The lineage of a model also depends on the catalog.json entries it reads and on the resolver, stored next to the checksum
+DBT_MODEL_CHECKSUMS_QUERY = """
+    UNWIND $rows AS row
+    MATCH (model:DbtModel {id: row.model_id})
+    SET model.checksum = row.checksum,
+        model.catalog_digest = row.catalog_digest,
+        model.resolver_version = row.resolver_version
+"""
 
-    # --- 1. Extract tables including DB + schema ---
-    alias_to_table = {}
+DBT_SOURCES_QUERY = """
+    UNWIND $rows AS row
+    MERGE (t:Table {name: row.table_name, schema: row.schema_name, db_name: row.db_name, source: row.source})
+"""
 
-    for table in ast.find_all(exp.Table):
+# FEEDS_DATA_INTO: source -> model
+FEEDS_DATA_INTO_QUERY = """
+    UNWIND $rows AS row
+    MATCH (m:DbtModel {id: row.model_id})
+    MATCH (s:Table {name: row.table_name, schema: row.schema_name, db_name: row.db_name})
+    MERGE (s)-[:FEEDS_DATA_INTO]->(m)
+"""
 
-        alias = table.alias or table.name
+# PROCEEDS_TO: model -> model
+PROCEEDS_TO_QUERY = """
+    UNWIND $rows AS row
+    MATCH (m1:DbtModel {id: row.model_id})
+    MATCH (m2:DbtModel {id: row.depends_on_id})
+    MERGE (m2)-[:PROCEEDS_TO]->(m1)
+"""
 
-        db = safe_name(table.catalog)  
-        schema = safe_name(table.db)  
-        name = safe_name(table.name)
+# GENERATES: model -> physical table/view
+GENERATES_QUERY = """
+    UNWIND $rows AS row
+    MATCH (m:DbtModel {id: row.model_id})
+    MERGE (t:Table {name: row.table_name, schema: row.schema_name, db_name: row.db_name, source: row.source_name})
+    MERGE (m)-[:GENERATES]->(t)
+"""
 
-        parts = [p for p in [db, schema, name] if p]
-        full_name = ".".join(parts)
+# Lineage owned by a model: its inputs, its generated table and the lineage into its columns
+MODEL_LINEAGE_CLEANUP_QUERIES = [
+    """
+    UNWIND $rows AS row
+    MATCH (:Table)-[r:FEEDS_DATA_INTO]->(:DbtModel {id: row.model_id})
+    DELETE r
+    """,
+    """
+    UNWIND $rows AS row
+    MATCH (:DbtModel)-[r:PROCEEDS_TO]->(:DbtModel {id: row.model_id})
+    DELETE r
+    """,
+    """
+    UNWIND $rows AS row
+    MATCH (:DbtModel {id: row.model_id})-[r:GENERATES]->(:Table)
+    DELETE r
+    """,
+    """
+    UNWIND $rows AS row
+    MATCH (:Table {name: row.table_name, schema: row.schema, db_name: row.database})<-[:BELONGS_TO]-(:Column)<-[r:TRANSFORMED_TO]-(:Column)
+    DELETE r
+    """,
+]
 
-        alias_to_table[alias] = full_name
+DELETE_MODELS_QUERY = """
+    UNWIND $rows AS row
+    MATCH (m:DbtModel {id: row.model_id})
+    DETACH DELETE m
+"""
 
-    # --- 2. SELECT list ---
-    select_exprs = ast.selects
+# --- Batched (UNWIND) column lineage writes ---
+COLUMN_NODES_QUERY = """
+    UNWIND $rows AS row
+    MERGE (c:Column {id: row.id})
+    SET c.name = row.name,
+        c.table_name = row.table_name,
+        c.schema = row.schema,
+        c.db_name = row.db_name,
+        c.data_type = coalesce(row.data_type, c.data_type)
+"""
 
-    # --- 3. Handle GROUP BY numeric indexes ---
-    group_positions = []
-    if ast.args.get("group"):
-        for g in ast.args["group"].expressions:
-            if isinstance(g, exp.Literal) and g.is_int:
-                group_positions.append(int(g.this) - 1)
+TRANSFORMED_TO_QUERY = """
+    UNWIND $rows AS row
+    MATCH (src:Column {id: row.source_id})
+    MATCH (tgt:Column {id: row.target_id})
+    MERGE (src)-[:TRANSFORMED_TO]->(tgt)
+"""
 
-    # --- 4. Build lineage ---
-    column_lineage = {}
+BELONGS_TO_QUERY = """
+    UNWIND $rows AS row
+    MATCH (c:Column {id: row.column_id})
+    MERGE (t:Table {name: row.table_name, schema: row.schema, db_name: row.db_name, source: row.source})
+    MERGE (c)-[:BELONGS_TO]->(t)
+"""
 
-    for i, sel in enumerate(select_exprs):
-        # Target column name
-        if isinstance(sel, exp.Alias):
-            target = sel.alias
-            expr = sel.this
-        else:
-            target = sel.sql()
-            expr = sel
-
-        # Extract all source columns used within the expression
-        source_cols = list(expr.find_all(exp.Column))
-
-        sources = []
-        for col in source_cols:
-            alias = col.table or list(alias_to_table.keys())[0]  # fallback
-            sources.append({
-                "table": alias_to_table.get(alias, alias),
-                "column": col.name
-            })
+# --- Redshift catalog extraction ---
+class BoundedConnectionPool(ThreadedConnectionPool):
+    """ThreadedConnectionPool that blocks when all connections are in use instead of raising PoolError."""
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+
+    def getconn(self, key=None):
+        self._slots.acquire()
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self._slots.release()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(conn_kwargs, maxconn):
+    """Return the process-wide Redshift connection pool for these settings; no connection is opened until used."""
+    key = tuple(sorted((k, v) for k, v in conn_kwargs.items() if k != "password"))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = BoundedConnectionPool(0, max(1, maxconn), **conn_kwargs)
+            _pools[key] = pool
+        return pool
+
+
+def close_connection_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
+
+
+# Correct column names for DataFrame
+CATALOG_COLUMNS = [
+    "schema_name",
+    "table_name",
+    "column_name",
+    "data_type",
+    "is_nullable",
+    "constraint_type",
+    "constraint_name",
+    "referenced_schema",
+    "referenced_table",
+    "referenced_column",
+    "object_type"
+]
+
+INFORMATION_SCHEMA_COLUMNS_QUERY = """
+    SELECT
+        c.table_schema AS schema_name,
+        c.table_name AS table_name,
+        c.column_name AS column_name,
+        c.data_type AS data_type,
+        c.is_nullable AS is_nullable,
+        tc.constraint_type AS constraint_type,
+        kcu.constraint_name AS constraint_name,
+        rc.unique_constraint_schema AS referenced_schema,
+        kcu2.table_name AS referenced_table,
+        kcu2.column_name AS referenced_column,
+        t.table_type AS object_type 
+    FROM information_schema.columns c
+    LEFT JOIN information_schema.key_column_usage kcu
+        ON c.table_schema = kcu.table_schema
+        AND c.table_name = kcu.table_name
+        AND c.column_name = kcu.column_name
+    LEFT JOIN information_schema.table_constraints tc
+        ON kcu.constraint_schema = tc.table_schema
+        AND kcu.constraint_name = tc.constraint_name
+    LEFT JOIN information_schema.referential_constraints rc
+        ON tc.constraint_name = rc.constraint_name
+        AND tc.table_schema = rc.constraint_schema
+    LEFT JOIN information_schema.key_column_usage kcu2
+        ON rc.unique_constraint_name = kcu2.constraint_name
+        AND rc.unique_constraint_schema = kcu2.table_schema
+    LEFT JOIN information_schema.tables t
+        ON c.table_schema = t.table_schema
+        AND c.table_name = t.table_name
+    WHERE c.table_schema = %s
+    ORDER BY c.table_name, c.ordinal_position;
+"""
+
+# Same result set read straight from pg_catalog, without the information_schema views.
+# Constraint key arrays are unnested with generate_series so it runs on Redshift and PostgreSQL alike.
+PG_CATALOG_COLUMNS_QUERY = """
+    SELECT
+        n.nspname AS schema_name,
+        c.relname AS table_name,
+        a.attname AS column_name,
+        format_type(a.atttypid, a.atttypmod) AS data_type,
+        CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END AS is_nullable,
+        CASE k.contype
+            WHEN 'p' THEN 'PRIMARY KEY'
+            WHEN 'f' THEN 'FOREIGN KEY'
+            WHEN 'u' THEN 'UNIQUE'
+        END AS constraint_type,
+        k.conname AS constraint_name,
+        rn.nspname AS referenced_schema,
+        rc.relname AS referenced_table,
+        ra.attname AS referenced_column,
+        CASE c.relkind WHEN 'v' THEN 'VIEW' ELSE 'BASE TABLE' END AS object_type
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n
+        ON n.oid = c.relnamespace
+    JOIN pg_catalog.pg_attribute a
+        ON a.attrelid = c.oid
+        AND a.attnum > 0
+        AND NOT a.attisdropped
+    LEFT JOIN (
+        SELECT
+            con.conrelid,
+            con.conname,
+            con.contype,
+            con.confrelid,
+            con.conkey[i] AS attnum,
+            con.confkey[i] AS ref_attnum
+        FROM pg_catalog.pg_constraint con
+        CROSS JOIN generate_series(1, 32) AS i
+        WHERE con.contype IN ('p', 'f', 'u')
+            AND i <= array_upper(con.conkey, 1)
+    ) k
+        ON k.conrelid = c.oid
+        AND k.attnum = a.attnum
+    LEFT JOIN pg_catalog.pg_class rc
+        ON rc.oid = k.confrelid
+    LEFT JOIN pg_catalog.pg_namespace rn
+        ON rn.oid = rc.relnamespace
+    LEFT JOIN pg_catalog.pg_attribute ra
+        ON ra.attrelid = k.confrelid
+        AND ra.attnum = k.ref_attnum
+    WHERE n.nspname = %s
+        AND c.relkind IN ('r', 'v', 'p')
+    ORDER BY c.relname, a.attnum;
+"""
+
+# Catalog fields a table fingerprint covers, per column and constraint row
+FINGERPRINT_COLUMNS = ["column_name", "data_type", "is_nullable", "constraint_type", "constraint_name",
+                       "referenced_schema", "referenced_table", "referenced_column", "object_type"]
+
+# Watermarked on end_time: a statement only becomes 'success' once it finishes, so a long
+# INSERT ... SELECT started before the previous run is still picked up by the next one
+QUERY_HISTORY_QUERY = """
+    SELECT query_id, end_time, query_text
+    FROM {table}
+    WHERE status = 'success'
+      AND lower(query_type) IN ('insert', 'ctas')
+      AND (end_time > %(end_time)s OR (end_time = %(end_time)s AND query_id > %(query_id)s))
+    ORDER BY end_time, query_id
+"""
+
+CATALOG_QUERIES = {
+    "information_schema": INFORMATION_SCHEMA_COLUMNS_QUERY,
+    "pg_catalog": PG_CATALOG_COLUMNS_QUERY
+}
+
+# --- Batched (UNWIND) Redshift catalog writes ---
+REDSHIFT_TABLES_QUERY = """
+    UNWIND $rows AS row
+    MERGE (t:Table {name: row.table_name, schema: row.schema_name, db_name: row.db_name, source: 'redshift'})
+    SET t.object_type = row.object_type
+"""
+
+# Written last, so an interrupted import never marks a table up to date
+REDSHIFT_TABLE_FINGERPRINTS_WRITE_QUERY = """
+    UNWIND $rows AS row
+    MATCH (t:Table {name: row.table_name, schema: row.schema_name, db_name: row.db_name, source: 'redshift'})
+    SET t.fingerprint = row.fingerprint
+"""
+
+# Fingerprints of the tables imported from the extracted schemas. dbt and query history
+# also MERGE redshift Tables; only the fingerprinted ones are owned by the catalog sync
+REDSHIFT_TABLE_FINGERPRINTS_QUERY = """
+    MATCH (t:Table {db_name: $db_name, source: 'redshift'})
+    WHERE t.schema IN $schemas AND t.fingerprint IS NOT NULL
+    RETURN t.schema AS schema_name, t.name AS table_name, t.fingerprint AS fingerprint
+"""
+
+# Catalog columns of a changed or dropped table that are no longer in the catalog. Columns
+# carrying lineage are also written by dbt / query history: they only lose the catalog fields
+REDSHIFT_STALE_COLUMNS_QUERY = """
+    UNWIND $rows AS row
+    MATCH (c:Column {from_catalog: true})-[:BELONGS_TO]->(:Table {name: row.table_name, schema: row.schema_name, db_name: row.db_name, source: 'redshift'})
+    WHERE NOT c.id IN row.column_ids
+    OPTIONAL MATCH (c)-[r:REFERENCES]-()
+    DELETE r
+    WITH DISTINCT c
+    REMOVE c.from_catalog, c.is_nullable, c.constraint_type, c.constraint_name
+    WITH c
+    WHERE NOT (c)-[:TRANSFORMED_TO]-()
+    DETACH DELETE c
+"""
 
-        column_lineage[target] = sources
+# Dropped tables, once their catalog columns are gone; tables still used by dbt or mined lineage are kept
+REDSHIFT_DELETE_TABLES_QUERY = """
+    UNWIND $rows AS row
+    MATCH (t:Table {name: row.table_name, schema: row.schema_name, db_name: row.db_name, source: 'redshift'})
+    WHERE t.fingerprint IS NOT NULL
+    REMOVE t.fingerprint, t.object_type
+    WITH t
+    WHERE NOT (t)--()
+    DELETE t
+"""
 
-    return column_lineage
+REDSHIFT_COLUMNS_QUERY = """
+    UNWIND $rows AS row
+    MERGE (c:Column {id: row.id})
+    SET c.name = row.column_name,
+        c.table_name = row.table_name,
+        c.schema = row.schema_name,
+        c.db_name = row.db_name,
+        c.data_type = row.data_type,
+        c.is_nullable = row.is_nullable,
+        c.constraint_type = row.constraint_type,
+        c.constraint_name = row.constraint_name,
+        c.from_catalog = true
+    WITH c, row
+    MATCH (t:Table {name: row.table_name, schema: row.schema_name, db_name: row.db_name, source: 'redshift'})
+    MERGE (c)-[:BELONGS_TO]->(t)
+"""
 
+# Foreign keys of changed tables are rewritten from the catalog, so dropped constraints leave no edge behind
+REDSHIFT_STALE_REFERENCES_QUERY = """
+    UNWIND $rows AS row
+    MATCH (:Table {name: row.table_name, schema: row.schema_name, db_name: row.db_name, source: 'redshift'})<-[:BELONGS_TO]-(:Column)-[r:REFERENCES]->()
+    DELETE r
+"""
 
+REFERENCES_QUERY = """
+    UNWIND $rows AS row
+    MATCH (c1:Column {id: row.source_id})
+    MATCH (c2:Column {id: row.target_id})
+    MERGE (c1)-[:REFERENCES]->(c2)
+"""
 
-class DbtSourceConnector:
-    def __init__(self, dbt_project_path, neo4j_uri=NEO4J_URI, neo4j_user=NEO4J_USERNAME, neo4j_password=NEO4J_PASSWORD):
+
+def _table(*fields):
+    return lambda row: tuple(row[field] for field in fields)
+
+
+def _field(field):
+    return lambda row: row[field]
+
+
+# Partition key of each query written in parallel: the key of the node it MERGEs (or deletes),
+# so concurrent transactions never MERGE the same node; relationship-only queries use both ends
+WRITE_PARTITION_KEYS = {
+    DBT_MODELS_QUERY: _field("model_id"),
+    DBT_MODEL_CHECKSUMS_QUERY: _field("model_id"),
+    DBT_SOURCES_QUERY: _table("db_name", "schema_name", "table_name", "source"),
+    FEEDS_DATA_INTO_QUERY: _table("model_id", "db_name", "schema_name", "table_name"),
+    PROCEEDS_TO_QUERY: _table("depends_on_id", "model_id"),
+    GENERATES_QUERY: _table("db_name", "schema_name", "table_name", "source_name"),
+    MODEL_LINEAGE_CLEANUP_QUERIES[0]: _field("model_id"),
+    MODEL_LINEAGE_CLEANUP_QUERIES[1]: _field("model_id"),
+    MODEL_LINEAGE_CLEANUP_QUERIES[2]: _field("model_id"),
+    MODEL_LINEAGE_CLEANUP_QUERIES[3]: _table("database", "schema", "table_name"),
+    DELETE_MODELS_QUERY: _field("model_id"),
+    COLUMN_NODES_QUERY: _field("id"),
+    TRANSFORMED_TO_QUERY: _table("source_id", "target_id"),
+    BELONGS_TO_QUERY: _table("db_name", "schema", "table_name", "source"),
+    REDSHIFT_TABLES_QUERY: _table("db_name", "schema_name", "table_name"),
+    REDSHIFT_TABLE_FINGERPRINTS_WRITE_QUERY: _table("db_name", "schema_name", "table_name"),
+    REDSHIFT_STALE_COLUMNS_QUERY: _table("db_name", "schema_name", "table_name"),
+    REDSHIFT_DELETE_TABLES_QUERY: _table("db_name", "schema_name", "table_name"),
+    REDSHIFT_COLUMNS_QUERY: _field("id"),
+    REDSHIFT_STALE_REFERENCES_QUERY: _table("db_name", "schema_name", "table_name"),
+    REFERENCES_QUERY: _table("source_id", "target_id"),
+}
+
+# Project directories whose .sql / .yml files change what `dbt compile` produces
+DBT_FINGERPRINT_DIRS = ["models", "macros", "snapshots", "analyses", "seeds", "dbt_packages"]
+# Project files fixing the configuration, vars and installed packages
+DBT_FINGERPRINT_FILES = ["dbt_project.yml", "packages.yml", "dependencies.yml", "package-lock.yml"]
+
+
+def project_fingerprint(project_path):
+    """
+    Hash the path and content of every file dbt compiles from (.sql and .yml
+    files under DBT_FINGERPRINT_DIRS, plus DBT_FINGERPRINT_FILES) and the
+    DBT_* environment variables models can read through env_var().
+    """
+    project_path = Path(project_path)
+    files = [project_path / name for name in DBT_FINGERPRINT_FILES]
+    for directory in DBT_FINGERPRINT_DIRS:
+        files += [*(project_path / directory).rglob("*.sql"), *(project_path / directory).rglob("*.yml")]
+    digest = hashlib.sha256()
+    for path in sorted(files):
+        if not path.is_file():
+            continue
+        digest.update(str(path.relative_to(project_path)).encode())
+        digest.update(hashlib.sha256(path.read_bytes()).digest())
+    for name, value in sorted(os.environ.items()):
+        if name.startswith("DBT_"):
+            digest.update(f"{name}={value}".encode())
+    return digest.hexdigest()
+
+
+def model_checksum(model_data):
+    """Return the checksum dbt computed for a manifest node, or None if it has none."""
+    return (model_data.get("checksum") or {}).get("checksum")
+
+
+class DbtSourceConnector(Neo4jConnector):
+    def __init__(self, dbt_project_path, neo4j_uri=NEO4J_URI, neo4j_user=NEO4J_USERNAME, neo4j_password=NEO4J_PASSWORD, batch_size=NEO4J_BATCH_SIZE,
+                 workers=LINEAGE_WORKERS, lineage_cache_dir=LINEAGE_CACHE_DIR, sql_dialect=None, model_window=DBT_MODEL_WINDOW,
+                 reachability_index=None, write_parallelism=NEO4J_WRITE_PARALLELISM):
+        super().__init__(neo4j_uri, neo4j_user, neo4j_password)
         self.project_path = Path(dbt_project_path)
-        self.driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
-
-    def compile_dbt_model(self):
-        MODELS_PATH = self.project_path / "models"
-        sql_files = list(MODELS_PATH.rglob("*.sql"))
-    
-    
-        result = subprocess.run(
-            ["dbt", "compile"],
-            cwd=self.project_path,
-            capture_output=True,
-            text=True
+        self.write_parallelism = write_parallelism
+        self.batch_size = batch_size
+        self.workers = workers
+        self.lineage_cache_dir = Path(lineage_cache_dir) if lineage_cache_dir else self.project_path / "target" / "lineage_cache"
+        self.sql_dialect = sql_dialect
+        self.model_window = model_window
+        # (catalog.json mtime, schema map, {unique_id: schema map key}), reloaded when dbt regenerates the catalog
+        self._catalog = (None, None, None)
+        # Optional ReachabilityIndex kept in step with the lineage written to Neo4j
+        self.reachability_index = reachability_index
+
+    @property
+    def fingerprint_path(self):
+        return self.project_path / "target" / "compile_fingerprint.json"
+
+    def is_compiled(self, fingerprint=None, state_modified=False):
+        """
+        True when target/manifest.json was produced from the current project files
+        by a full compile or, when `state_modified` is set, by a state:modified+ one.
+        A state:modified+ compile leaves unselected models uncompiled, so it never
+        stands in for a full compile.
+        """
+        manifest_path = self.project_path / "target" / "manifest.json"
+        if not manifest_path.exists() or not self.fingerprint_path.exists():
+            return False
+        with open(self.fingerprint_path) as f:
+            saved = json.load(f)
+        modes = ("full", "state_modified") if state_modified else ("full",)
+        return (
+            saved.get("mode") in modes
+            and saved.get("fingerprint") == (fingerprint or project_fingerprint(self.project_path))
+            and saved.get("manifest_mtime") == manifest_path.stat().st_mtime
         )
-    
-        if result.returncode != 0:
-            print(f"❌ Error compiling dbt project")
-            print(result.stderr)
-        else:
-            print(f"✅ Compiled dbt project")
-            print(result.stdout)
 
-    def load_manifest(self):
+    @property
+    def checkpoint_name(self):
+        """Name of the import checkpoint file, unique per project directory."""
+        return f"dbt-{hashlib.sha256(str(self.project_path.resolve()).encode()).hexdigest()[:12]}"
+
+    def compile_dbt_model(self, force=False, state_modified=False, state_path=DBT_STATE_PATH, progress=None):
+        """
+        Run `dbt compile`, skipping it when the project files are unchanged since
+        the last compile (only a full compile satisfies a full one). With `state_modified=True` only models modified against
+        the manifest saved in `state_path` (and their children) are compiled,
+        deferring unselected references to that state. dbt output is streamed to
+        `progress` line by line; a failing compile raises RuntimeError.
+        Returns "skipped" or "compiled".
+        """
+        progress = progress or ImportProgress()
+        fingerprint = project_fingerprint(self.project_path)
+        if not force and self.is_compiled(fingerprint, state_modified):
+            progress.log("dbt project unchanged since the last compile")
+            print("✅ dbt project unchanged since the last compile, skipping dbt compile")
+            return "skipped"
+
+        command = ["dbt", "compile"]
+        mode = "full"
+        if state_modified:
+            if state_path and (Path(state_path) / "manifest.json").exists():
+                command += ["--select", "state:modified+", "--defer", "--state", str(state_path)]
+                mode = "state_modified"
+            else:
+                print(f"⚠️ No saved manifest in '{state_path}', compiling the whole project")
+
+        progress.phase("compiling dbt project")
+        tail = deque(maxlen=DBT_LOG_TAIL)
+        with Metrics.span("dbt_compile"):
+            process = subprocess.Popen(
+                command,
+                cwd=self.project_path,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1
+            )
+            for line in process.stdout:
+                line = line.rstrip()
+                progress.log(line)
+                tail.append(line)
+                print(line)
+            returncode = process.wait()
+
+        if returncode != 0:
+            print("❌ Error compiling dbt project")
+            raise RuntimeError(f"dbt compile failed with exit code {returncode}:\n" + "\n".join(tail))
+
+        manifest_path = self.project_path / "target" / "manifest.json"
+        with open(self.fingerprint_path, "w") as f:
+            json.dump({"fingerprint": fingerprint, "manifest_mtime": manifest_path.stat().st_mtime, "mode": mode}, f)
+        print("✅ Compiled dbt project")
+        return "compiled"
+
+    def get_catalog_schema(self):
+        """
+        Schema map ({"db.schema.table": {column: data_type}}) of target/catalog.json
+        written by `dbt docs generate`, or None when the project has no catalog.
+        """
+        catalog_path = self.project_path / "target" / "catalog.json"
+        if not catalog_path.exists():
+            return None
+        mtime = catalog_path.stat().st_mtime
+        if self._catalog[0] != mtime:
+            relations = {}
+            with Metrics.span("catalog_load"):
+                schema = load_catalog_schema(catalog_path, relations)
+            print(f"📚 Loaded {len(schema)} relations from catalog.json")
+            self._catalog = (mtime, schema, relations)
+        return self._catalog[1]
+
+    def model_catalog_tables(self, model_id, model_data):
+        """
+        Catalog keys of the relations a model is resolved against: its own and
+        those of its depends_on nodes. Nodes missing from the catalog are keyed
+        by their id, so a digest changes once they appear.
+        """
+        relations = self._catalog[2] or {}
+        node_ids = (model_id, *model_data.get("depends_on", {}).get("nodes", []))
+        return [relations.get(node_id, node_id) for node_id in node_ids]
+
+    def model_catalog_digest(self, model_id, model_data):
+        """schema_digest (with types) of the catalog entries of a model, or None when the project has no catalog."""
+        catalog = self.get_catalog_schema()
+        if catalog is None:
+            return None
+        return schema_digest(catalog, types=True, tables=self.model_catalog_tables(model_id, model_data))
+
+    def iter_models(self, metadata=None):
+        """Stream (model_id, node) pairs from target/manifest.json, filling `metadata` on the way."""
         manifest_path = self.project_path / "target" / "manifest.json"
         if not manifest_path.exists():
             raise FileNotFoundError(f"{manifest_path} not found. Run dbt first!")
-        with open(manifest_path) as f:
-            manifest = json.load(f)
-        return manifest
-
-    def import_metadata_neo4j(self):
-        """Import dbt model metadata and lineage (models, sources, dependencies, generated tables) into Neo4j."""
-        manifest = self.load_manifest()
-        nodes = manifest.get("nodes", {})
-    
-        if not nodes:
-            print("⚠️ No models found in manifest.json.")
-            return
-    
-        print(f"📦 Importing {len(nodes)} models into Neo4j...")
-    
-        # --- Transaction helper functions ---
-        def create_models_and_sources(tx, models, sources):
-            """Create DbtModel nodes and Source/Table nodes."""
-            for m in models:
-                tx.run(
-                    """
-                    MERGE (model:DbtModel {id: $model_id})
-                    SET model.name = $model_name,
-                        model.description = $description,
-                        model.tags = $tags,
-                        model.materialized = $materialized
-                    """,
-                    model_id=m["model_id"],
-                    model_name=m["model_name"],
-                    description=m["description"],
-                    tags=m["tags"],
-                    materialized=m["materialized"]
-                )
-            for s in sources:
-                tx.run(
-                    """
-                    MERGE (t:Table {name: $table_name, schema: $schema_name, db_name: $db_name, source: $source})
-                    """,
-                    table_name=s["table_name"],
-                    schema_name=s["schema_name"],
-                    db_name=s["db_name"],
-                    source=s["source"]
-                )
-    
-        def create_relationships(tx, model_sources, model_deps, generates):
-            """Create relationships between sources and models, models, and generated tables."""
-            # FEEDS_DATA_INTO: source -> model
-            for rel in model_sources:
-                tx.run(
-                    """
-                    MATCH (m:DbtModel {id: $model_id})
-                    MATCH (s:Table {name: $table_name, schema: $schema_name, db_name: $db_name})
-                    MERGE (s)-[:FEEDS_DATA_INTO]->(m)
-                    """,
-                    model_id=rel["model_id"],
-                    table_name=rel["table_name"],
-                    schema_name=rel["schema_name"],
-                    db_name=rel["db_name"]
-                )
-    
-            # PROCEEDS_TO: model -> model
-            for rel in model_deps:
-                tx.run(
-                    """
-                    MATCH (m1:DbtModel {id: $model_id})
-                    MATCH (m2:DbtModel {id: $depends_on_id})
-                    MERGE (m2)-[:PROCEEDS_TO]->(m1)
-                    """,
-                    model_id=rel["model_id"],
-                    depends_on_id=rel["depends_on_id"]
-                )
-    
-            # GENERATES_TO: model -> physical table/view
-            for rel in generates:
-                tx.run(
-                    """
-                    MATCH (m:DbtModel {id: $model_id})
-                    MERGE (t:Table {name: $table_name, schema: $schema_name, db_name: $db_name, source: $source})
-                    MERGE (m)-[:GENERATES]->(t)
-                    """,
-                    model_id=rel["model_id"],
-                    table_name=rel["table_name"],
-                    schema_name=rel["schema_name"],
-                    db_name=rel["db_name"],
-                    source=rel["source_name"]
-                )
-            
-        def create_column_nodes(tx, db_name, schema, table_name, name):
+        return Metrics.timed_iter(iter_manifest_models(manifest_path, metadata), "manifest_load")
+
+    def build_records(self, models, source_name, lineage_pool=None):
+        """
+        Collect DbtModel, Table and Column records plus their relationships
+        for the given (model_id, model_data) pairs, deduplicated and ready
+        to be sent as UNWIND batches. SQL is parsed on `lineage_pool` (a
+        SqlLineage.LineagePool over the catalog schema) when given.
+        """
+        model_records = []
+        source_records = set()
+        model_source_rels = []
+        model_dependency_rels = []
+        generates_rels = []
+        column_nodes = {}
+        transformed_to_rels = {}
+        belongs_to_rels = {}
+        catalog = self.get_catalog_schema()
+
+        def add_column_node(db_name, schema, table_name, name):
             """
-            Create or merge a Column node.
+            Collect a Column node (deduplicated on its id) and return the id.
             """
-            tx.run(
-                """
-                MERGE (c:Column {
-                    id: $id
-                })
-                SET c.name = $column_name,
-                    c.table_name = $table_name,
-                    c.schema = $schema_name,
-                    c.db_name = $db_name
-                """,
-                id=f"{db_name}.{schema}.{table_name}.{name}",
-                column_name=name,
-                table_name=table_name,
-                schema_name=schema,
-                db_name = db_name
-            )
-
+            column_id = f"{db_name}.{schema}.{table_name}.{name}"
+            column_nodes[column_id] = {
+                "id": column_id,
+                "name": name,
+                "table_name": table_name,
+                "schema": schema,
+                "db_name": db_name,
+                # Type from catalog.json, when the table is in it
+                "data_type": (catalog or {}).get(f"{db_name}.{schema}.{table_name}".lower(), {}).get(name.lower())
+            }
+            return column_id
 
-        def create_column_relationships(tx, source_dbname, source_schema, source_table, source_col, target_dbname, target_schema, target_table, target_col, source):
+        def add_column_relationships(source_id, source_dbname, source_schema, source_table, target_id, target_dbname, target_schema, target_table, source):
             """
-            Create lineage between columns:
+            Collect lineage between columns:
                 (source_column) -[:TRANSFORMED_TO]-> (target_column)
+            together with the BELONGS_TO edges of both columns.
             """
-            tx.run(
-                """
-                MATCH (src:Column {id: $source_id})
-                MATCH (tgt:Column {id: $target_id})
-                MERGE (src)-[:TRANSFORMED_TO]->(tgt)
-                """,
-                source_id=f"{source_dbname}.{source_schema}.{source_table}.{source_col}",
-                target_id=f"{target_dbname}.{target_schema}.{target_table}.{target_col}"
+            transformed_to_rels[(source_id, target_id)] = {
+                "source_id": source_id,
+                "target_id": target_id
+            }
+            for column_id, table_name, schema, db_name in (
+                (source_id, source_table, source_schema, source_dbname),
+                (target_id, target_table, target_schema, target_dbname),
+            ):
+                belongs_to_rels[(column_id, table_name, schema, db_name, source)] = {
+                    "column_id": column_id,
+                    "table_name": table_name,
+                    "schema": schema,
+                    "db_name": db_name,
+                    "source": source
+                }
+
+        models = list(models)
+
+        # Extract columns and their source for all models in one parallel, cached pass
+        with Metrics.span("sql_parse"):
+            lineage = extract_lineage_batch(
+                {model_id: model_data["compiled_code"] for model_id, model_data in models},
+                dialect=self.sql_dialect,
+                workers=self.workers,
+                cache_dir=self.lineage_cache_dir,
+                schema=catalog,
+                # Cached lineage of a model only depends on the catalog entries it reads
+                schema_hashes={
+                    model_id: schema_digest(catalog, tables=self.model_catalog_tables(model_id, model_data))
+                    for model_id, model_data in models
+                } if catalog else None,
+                pool=lineage_pool
             )
 
-            tx.run(
-                    """
-                    MATCH (m:Column {id: $source_id})
-                    MERGE (t:Table {name: $source_table, schema: $source_schema, db_name: $source_dbname, source: $source})
-                    MERGE (m)-[:BELONGS_TO]->(t)
-                    """,
-                    source_table=source_table,
-                    source_schema=source_schema,
-                    source_dbname=source_dbname,
-                    source_id=f"{source_dbname}.{source_schema}.{source_table}.{source_col}",
-                    source=source
-                )
-            tx.run(
-                    """
-                    MATCH (m:Column {id: $target_id})
-                    MERGE (t:Table {name: $target_table, schema: $target_schema, db_name: $target_dbname, source: $source})
-                    MERGE (m)-[:BELONGS_TO]->(t)
-                    """,
-                    target_table=target_table,
-                    target_schema=target_schema,
-                    target_dbname=target_dbname,
-                    target_id=f"{target_dbname}.{target_schema}.{target_table}.{target_col}",
-                    source=source
-                )
+        for model_id, model_data in models:
+            column_source = lineage[model_id]
 
-        # --- Prepare data ---
-        model_records = []
-        source_records = set()
-        model_source_rels = []
-        model_dependency_rels = []
-        generates_rels = []
-        source_name = manifest["metadata"]["adapter_type"]
-        for model_id, model_data in nodes.items():
-            if model_data.get("resource_type") != "model":
-                continue  # skip tests, macros, etc.
-            # Extract columns and their source
-            column_source = extract_source_from_sql(model_data["compiled_code"])
-            
             for output_column, sources in column_source.items():
-                with self.driver.session() as session:
-                    # Create target (output) column node
-                    session.execute_write(
-                        create_column_nodes,
+                # Target (output) column node
+                target_table = model_id.split(".")[-1]
+                target_id = add_column_node(
+                    model_data["database"],
+                    model_data["schema"],
+                    target_table,
+                    output_column
+                )
+
+                # Source columns + relationships
+                for related_col in sources:
+                    src_table_parts = related_col["table"].split(".")
+                    if len(src_table_parts) != 3:
+                        continue  # not a fully qualified physical table (e.g. correlated reference)
+                    src_table = src_table_parts[2]
+                    src_schema = src_table_parts[1]
+                    src_dbname = src_table_parts[0]
+                    src_column = related_col["column"]
+
+                    source_id = add_column_node(
+                        src_dbname,
+                        src_schema,
+                        src_table,
+                        src_column
+                    )
+                    add_column_relationships(
+                        source_id,
+                        src_dbname,
+                        src_schema,
+                        src_table,
+                        target_id,
                         model_data["database"],
                         model_data["schema"],
-                        model_id.split(".")[-1],
-                        output_column
+                        target_table,
+                        source_name
                     )
 
-                    # Create source columns + relationships
-                    for related_col in sources:
-                        src_table_parts = related_col["table"].split(".")
-                        src_table = src_table_parts[2]
-                        src_schema = src_table_parts[1]
-                        src_dbname = src_table_parts[0]
-                        src_column = related_col["column"]
-
-                        # Create source column node
-                        session.execute_write(
-                            create_column_nodes,
-                            src_dbname,
-                            src_schema,
-                            src_table,
-                            src_column
-                        )
-
-                        # Create lineage relationship
-                        session.execute_write(
-                            create_column_relationships,
-                            src_dbname,
-                            src_schema,
-                            src_table,
-                            src_column,
-                            model_data["database"],
-                            model_data["schema"],
-                            model_id.split(".")[-1],
-                            output_column,
-                            source_name
-                        )
-
-
             config = model_data.get("config", {})
             materialized = config.get("materialized", "table")
             relation_name = model_data.get("relation_name")  # physical table/view if exists
-    
+
             # Model node
             model_records.append({
                 "model_id": model_id,
                 "model_name": model_data.get("name", ""),
                 "description": model_data.get("description", ""),
                 "tags": model_data.get("tags", []),
-                "materialized": materialized
+                "materialized": materialized,
+                "package_name": model_id.split(".")[1],
+                "database": model_data.get("database", ""),
+                "schema": model_data.get("schema", ""),
+                "checksum": model_checksum(model_data),
+                "catalog_digest": self.model_catalog_digest(model_id, model_data),
+                "resolver_version": LINEAGE_RESOLVER_VERSION
             })
-            
+
             # Handle dependencies
             depends_on_nodes = model_data.get("depends_on", {}).get("nodes", [])
             for dep in depends_on_nodes:
                 if dep.startswith("source."):
                     parts = dep.split(".")
                     if len(parts) >= 4:
-                        _, project, source_name, table_name = parts[-4:]
-                        source_records.add((source_name, table_name, model_data.get("database", ""), model_data.get("schema", "")))
+                        _, project, dbt_source_name, table_name = parts[-4:]
+                        source_records.add((dbt_source_name, table_name, model_data.get("database", ""), model_data.get("schema", "")))
                         model_source_rels.append({
                             "model_id": model_id,
-                            "source_name": source_name,
+                            "source_name": dbt_source_name,
                             "table_name": table_name,
                             "db_name": model_data.get("database", ""),
                             "schema_name": model_data.get("schema", "")
@@ -364,7 +774,7 @@ class DbtSourceConnector:
                         "model_id": model_id,
                         "depends_on_id": dep
                     })
-    
+
             # Handle GENERATES_TO relationship
             if relation_name:
                 parts = relation_name.replace('"', '').split(".")
@@ -377,24 +787,188 @@ class DbtSourceConnector:
                         "schema_name": schema_name,
                         "db_name": db_name
                     })
-    
-        # Convert source_records to list of dicts
-        source_dicts = [
-            {"source": src, "table_name": tbl, "db_name": db, "schema_name": schema}
-            for src, tbl, db, schema in source_records
-        ]
-    
-        # --- Execute transactions ---
+
+        return {
+            "models": model_records,
+            "sources": [
+                {"source": src, "table_name": tbl, "db_name": db, "schema_name": schema}
+                for src, tbl, db, schema in sorted(source_records)
+            ],
+            "model_sources": model_source_rels,
+            "model_dependencies": model_dependency_rels,
+            "generates": generates_rels,
+            "columns": list(column_nodes.values()),
+            "transformed_to": list(transformed_to_rels.values()),
+            "belongs_to": list(belongs_to_rels.values())
+        }
+
+    def get_imported_models(self):
+        """Return {model_id: DbtModel properties} of every previously imported dbt model."""
         with self.driver.session() as session:
-            print("🧩 Creating DbtModel and Table nodes...")
-            session.execute_write(create_models_and_sources, model_records, source_dicts)
-    
-            print("🔗 Creating relationships (FEEDS_DATA_INTO, PROCEEDS_TO, GENERATES_TO)...")
-            session.execute_write(create_relationships, model_source_rels, model_dependency_rels, generates_rels)
-    
-        print("✅ Metadata successfully imported into Neo4j.")
-
-class RedshiftSourceConnector():
+            result = session.run(
+                """
+                MATCH (m:DbtModel)
+                WHERE m.package_name IS NOT NULL
+                RETURN m.id AS model_id, m.package_name AS package_name, m.database AS database,
+                       m.schema AS schema, m.checksum AS checksum, m.catalog_digest AS catalog_digest,
+                       m.resolver_version AS resolver_version
+                """
+            )
+            return {
+                record["model_id"]: {**record.data(), "table_name": record["model_id"].split(".")[-1]}
+                for record in result
+            }
+
+    def iter_record_windows(self, skip=None, progress=None):
+        """
+        Stream the models of target/manifest.json in windows of `model_window`
+        models and yield (window, build_records output) for each, so memory does
+        not grow with the manifest size. Models for which `skip(model_id,
+        model_data)` is true are left out, and so are models without
+        compiled_code (after `dbt parse` or a state:modified+ compile).
+        SQL of every window is parsed on one LineagePool.
+        """
+        metadata = {}
+        window = []
+        with LineagePool(self.workers, self.get_catalog_schema()) as lineage_pool:
+            for model_id, model_data in self.iter_models(metadata):
+                if skip is not None and skip(model_id, model_data):
+                    continue
+                if "compiled_code" not in model_data:
+                    # Not selected by a state:modified+ compile: keep what the graph has
+                    if progress is not None:
+                        progress.count("models_not_compiled")
+                    continue
+                window.append((model_id, model_data))
+                if len(window) >= self.model_window:
+                    yield window, self.build_records(window, metadata["adapter_type"], lineage_pool)
+                    window = []
+            if window:
+                yield window, self.build_records(window, metadata["adapter_type"], lineage_pool)
+
+    def write_records(self, writer, records, stale=()):
+        """Write a set of records built by build_records through a BatchWriter, clearing `stale` model lineage first."""
+        if stale:
+            for query in MODEL_LINEAGE_CLEANUP_QUERIES:
+                writer.write(query, stale)
+
+        # Every node before any relationship, so parallel partitions always find their endpoints
+        writer.write(DBT_MODELS_QUERY, records["models"])
+        writer.write(DBT_SOURCES_QUERY, records["sources"])
+        writer.write(COLUMN_NODES_QUERY, records["columns"])
+
+        writer.write(FEEDS_DATA_INTO_QUERY, records["model_sources"])
+        writer.write(GENERATES_QUERY, records["generates"])
+        writer.write(TRANSFORMED_TO_QUERY, records["transformed_to"])
+        writer.write(BELONGS_TO_QUERY, records["belongs_to"])
+
+    @Metrics.traced("dbt")
+    def import_metadata_neo4j(self, full_refresh=False, progress=None):
+        """
+        Import dbt model metadata and lineage (models, sources, dependencies, generated tables) into Neo4j.
+
+        The manifest is streamed and processed in windows of `model_window` models,
+        so memory does not grow with the manifest size. Only models whose manifest
+        checksum, lineage resolver version or digest of the catalog.json entries
+        of the model and its dependencies differs from the one stored on their
+        DbtModel node are parsed and written; lineage of models that no longer exist in the manifest is removed.
+        `full_refresh=True` rewrites every model. Phases and row counts are
+        reported to `progress` (an ImportJobs.ImportProgress).
+
+        Writes are committed in adaptively sized chunks and recorded in a
+        checkpoint file; checksums are only stored once everything else is
+        written, so an interrupted import reruns the same steps and resumes
+        after the last committed chunk.
+        """
+        progress = progress or ImportProgress()
+        progress.phase("reading imported model checksums")
+        checkpoint = ImportCheckpoint.for_name(self.checkpoint_name)
+        with Metrics.span("neo4j_read"):
+            # Models written by an interrupted run have no checksum yet but already exist
+            imported = checkpoint.snapshot("imported_models", self.get_imported_models)
+
+        seen_ids = set()
+        package_names = set()
+        model_dependency_rels = []
+        checksums = []
+        written = 0
+
+        with self.driver.session() as session:
+            writer = BatchWriter(session, self.batch_size, progress, checkpoint, driver=self.driver,
+                                 parallelism=self.write_parallelism, partition_keys=WRITE_PARTITION_KEYS)
+
+            def up_to_date(model_id, model_data):
+                seen_ids.add(model_id)
+                progress.count("models_read")
+                Metrics.count("lineage_rows_read_total")
+                package_names.add(model_id.split(".")[1])
+                checksum = model_checksum(model_data)
+                return not full_refresh and checksum is not None and imported.get(model_id, {}).get("checksum") == checksum \
+                    and imported[model_id].get("catalog_digest") == self.model_catalog_digest(model_id, model_data) \
+                    and imported[model_id].get("resolver_version") == LINEAGE_RESOLVER_VERSION
+
+            progress.phase("parsing and writing changed models")
+
+            for window, records in self.iter_record_windows(skip=up_to_date, progress=progress):
+                # Lineage owned by models that are rewritten must be cleared first
+                stale = [imported[model_id] for model_id, _ in window if model_id in imported]
+                with Metrics.span("neo4j_write"):
+                    self.write_records(writer, records, stale)
+                if self.reachability_index is not None:
+                    self.reachability_index.clear_model_lineage(stale)
+                    self.reachability_index.add_dbt_records(records)
+                # PROCEEDS_TO needs both models, which may be in a later window
+                model_dependency_rels.extend(records["model_dependencies"])
+                checksums.extend({
+                    "model_id": m["model_id"], "checksum": m["checksum"],
+                    "catalog_digest": m["catalog_digest"], "resolver_version": m["resolver_version"]
+                } for m in records["models"])
+                progress.count("models_written", len(records["models"]))
+                progress.count("columns_written", len(records["columns"]))
+                print(f"🧩 Wrote {len(records['models'])} models and {len(records['columns'])} columns...")
+                written += len(window)
+
+            if not seen_ids:
+                print("⚠️ No models found in manifest.json.")
+                checkpoint.clear()
+                return
+
+            progress.phase("writing model dependencies")
+            print("🔗 Creating PROCEEDS_TO relationships...")
+            with Metrics.span("neo4j_write"):
+                writer.write(PROCEEDS_TO_QUERY, model_dependency_rels)
+            if self.reachability_index is not None:
+                self.reachability_index.add_model_dependencies(model_dependency_rels)
+
+            deleted = [
+                row for model_id, row in imported.items()
+                if row["package_name"] in package_names and model_id not in seen_ids
+            ]
+            if deleted:
+                progress.phase("removing deleted models")
+                print(f"🧹 Removing lineage of {len(deleted)} deleted models...")
+                with Metrics.span("neo4j_write"):
+                    for query in MODEL_LINEAGE_CLEANUP_QUERIES:
+                        writer.write(query, deleted)
+                    writer.write(DELETE_MODELS_QUERY, deleted)
+                if self.reachability_index is not None:
+                    self.reachability_index.clear_model_lineage(deleted)
+                    self.reachability_index.delete_models(deleted)
+                progress.count("models_deleted", len(deleted))
+
+            with Metrics.span("neo4j_write"):
+                writer.write(DBT_MODEL_CHECKSUMS_QUERY, checksums)
+
+        checkpoint.clear()
+        if self.reachability_index is not None:
+            self.reachability_index.save()
+
+        if not written and not deleted:
+            print(f"✅ All {len(seen_ids)} models are up to date in Neo4j.")
+        else:
+            print(f"✅ Imported {written} of {len(seen_ids)} models into Neo4j ({len(deleted)} removed).")
+
+class RedshiftSourceConnector(Neo4jConnector):
     def __init__(self, host = RED_SHIFT_HOST
                  , username = RED_SHIFT_USER
                  , password = RED_SHIFT_PASSWORD
@@ -402,149 +976,404 @@ class RedshiftSourceConnector():
                  , schema_name = RED_SHIFT_SCHEMA 
                  , neo4j_uri=NEO4J_URI
                  , neo4j_user=NEO4J_USERNAME
-                 , neo4j_password=NEO4J_PASSWORD):
+                 , neo4j_password=NEO4J_PASSWORD
+                 , batch_size=NEO4J_BATCH_SIZE
+                 , port=RED_SHIFT_PORT
+                 , extractor=RED_SHIFT_EXTRACTOR
+                 , workers=RED_SHIFT_WORKERS
+                 , fetch_size=RED_SHIFT_FETCH_SIZE
+                 , query_history_table=RED_SHIFT_QUERY_HISTORY_TABLE
+                 , query_watermark_path=RED_SHIFT_QUERY_WATERMARK
+                 , reachability_index=None
+                 , write_parallelism=NEO4J_WRITE_PARALLELISM):
+        super().__init__(neo4j_uri, neo4j_user, neo4j_password)
         self.db_name = db_name
-        self.driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
-        # Connect to Redshift
-        self.conn = psycopg2.connect(
-            host=host,
-            port=5439,
-            dbname=db_name,
-            user=username,
-            password=password
+        self.batch_size = batch_size
+        self.write_parallelism = write_parallelism
+        self.conn_kwargs = {
+            "host": host,
+            "port": port,
+            "dbname": db_name,
+            "user": username,
+            "password": password
+        }
+        # A comma separated string or a list of schemas
+        if isinstance(schema_name, str):
+            schema_name = [s.strip() for s in schema_name.split(",") if s.strip()]
+        self.schema_names = list(schema_name or [])
+        self.schema_name = self.schema_names[0] if self.schema_names else None
+        if extractor not in CATALOG_QUERIES:
+            raise ValueError(f"Unknown Redshift extractor '{extractor}', expected one of {sorted(CATALOG_QUERIES)}")
+        self.extractor = extractor
+        self.workers = workers
+        self.fetch_size = fetch_size
+        self.query_history_table = query_history_table
+        self.query_watermark_path = Path(query_watermark_path)
+        # Optional ReachabilityIndex kept in step with the lineage written to Neo4j
+        self.reachability_index = reachability_index
+
+        # Fetched from the warehouse on each import, not at construction time
+        self.columns_df = None
+
+    def _iter_schema_columns(self, conn, schema_name):
+        """Yield catalog rows of one schema, `fetch_size` rows at a time."""
+        try:
+            # pg_catalog / information_schema live on the leader node, which does not support server-side cursors
+            with conn.cursor() as cur:
+                cur.execute(CATALOG_QUERIES[self.extractor], (schema_name,))
+                while True:
+                    rows = cur.fetchmany(self.fetch_size)
+                    if not rows:
+                        break
+                    yield rows
+        finally:
+            conn.rollback()
+
+    def _get_schema_columns(self, pool, schema_name, progress=None):
+        conn = pool.getconn()
+        try:
+            frames = [
+                pd.DataFrame(rows, columns=CATALOG_COLUMNS)
+                for rows in self._iter_schema_columns(conn, schema_name)
+            ]
+        finally:
+            pool.putconn(conn, close=bool(conn.closed))
+        rows_read = sum(len(f) for f in frames)
+        if progress is not None:
+            progress.count("catalog_rows", rows_read)
+        print(f"📥 Read {rows_read} catalog rows from schema '{schema_name}'")
+        return frames
+
+    def _get_columns(self, progress=None):
+        """Fetch columns and constraints (including FK references) for tables in the schemas."""
+        if not self.schema_names:
+            return pd.DataFrame([], columns=CATALOG_COLUMNS)
+
+        pool = get_connection_pool(self.conn_kwargs, self.workers)
+        workers = max(1, min(self.workers, len(self.schema_names)))
+        with Metrics.span("redshift_catalog_query"), ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda schema: self._get_schema_columns(pool, schema, progress), self.schema_names))
+
+        frames = [frame for schema_frames in results for frame in schema_frames]
+        Metrics.count("lineage_rows_read_total", sum(len(frame) for frame in frames))
+        if not frames:
+            return pd.DataFrame([], columns=CATALOG_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def build_records(self, columns_df=None):
+        """
+        Turn the catalog DataFrame into deduplicated Table, Column and
+        foreign key records ready to be sent as UNWIND batches.
+        """
+        if columns_df is None:
+            columns_df = self.columns_df if self.columns_df is not None else self.refresh_metadata()
+        df = columns_df
+        df = df.astype(object).where(df.notna(), None)
+
+        column_ids = (
+            f"{self.db_name}." + df["schema_name"].astype(str)
+            + "." + df["table_name"].astype(str)
+            + "." + df["column_name"].astype(str)
+        )
+        df = df.assign(id=column_ids, db_name=self.db_name)
+
+        # One Table record per (schema, table) instead of one per column row
+        tables = (
+            df.drop_duplicates(["schema_name", "table_name"], keep="last")
+            [["table_name", "schema_name", "db_name", "object_type"]]
+        )
+        fingerprints = self.table_fingerprints(df)
+        tables = tables.assign(fingerprint=[
+            fingerprints.get((schema, table)) for schema, table in zip(tables["schema_name"], tables["table_name"])
+        ])
+
+        # A column appears once per constraint; the last row wins like the old row-by-row SET
+        columns = (
+            df.drop_duplicates("id", keep="last")
+            [["id", "column_name", "table_name", "schema_name", "db_name", "data_type",
+              "is_nullable", "constraint_type", "constraint_name"]]
         )
-        self.schema_name = schema_name
-
-        # Create DataFrames
-        self.columns_df = self._get_columns()
-
-        # Close connection
-        self.conn.close()
-
-    def _get_columns(self):
-        """Fetch columns and constraints (including FK references) for tables in the schema."""
-        query = """
-            SELECT
-                c.table_schema AS schema_name,
-                c.table_name AS table_name,
-                c.column_name AS column_name,
-                c.data_type AS data_type,
-                c.is_nullable AS is_nullable,
-                tc.constraint_type AS constraint_type,
-                kcu.constraint_name AS constraint_name,
-                rc.unique_constraint_schema AS referenced_schema,
-                kcu2.table_name AS referenced_table,
-                kcu2.column_name AS referenced_column,
-                t.table_type AS object_type 
-            FROM information_schema.columns c
-            LEFT JOIN information_schema.key_column_usage kcu
-                ON c.table_schema = kcu.table_schema
-                AND c.table_name = kcu.table_name
-                AND c.column_name = kcu.column_name
-            LEFT JOIN information_schema.table_constraints tc
-                ON kcu.constraint_schema = tc.table_schema
-                AND kcu.constraint_name = tc.constraint_name
-            LEFT JOIN information_schema.referential_constraints rc
-                ON tc.constraint_name = rc.constraint_name
-                AND tc.table_schema = rc.constraint_schema
-            LEFT JOIN information_schema.key_column_usage kcu2
-                ON rc.unique_constraint_name = kcu2.constraint_name
-                AND rc.unique_constraint_schema = kcu2.table_schema
-            LEFT JOIN information_schema.tables t
-                ON c.table_schema = t.table_schema
-                AND c.table_name = t.table_name
-            WHERE c.table_schema = %s
-            ORDER BY c.table_name, c.ordinal_position;
+
+        # Resolve FK targets to Column.id on the client side
+        fks = df[(df["constraint_type"] == "FOREIGN KEY") & df["referenced_table"].astype(bool)]
+        fks = pd.DataFrame({
+            "source_id": fks["id"],
+            "target_id": (
+                f"{self.db_name}." + fks["referenced_schema"].astype(str)
+                + "." + fks["referenced_table"].astype(str)
+                + "." + fks["referenced_column"].astype(str)
+            )
+        }).drop_duplicates()
+
+        return {
+            "tables": tables.to_dict("records"),
+            "columns": columns.to_dict("records"),
+            "foreign_keys": fks.to_dict("records")
+        }
+
+    @staticmethod
+    def table_fingerprints(df):
+        """
+        Return {(schema_name, table_name): sha256} over each table's columns in
+        catalog (ordinal) order, with their types and constraints.
         """
-    
-        with self.conn.cursor() as cur:
-            cur.execute(query, (self.schema_name,))
-            rows = cur.fetchall()
-    
-        # Correct column names for DataFrame
-        columns = [
-            "schema_name",
-            "table_name",
-            "column_name",
-            "data_type",
-            "is_nullable",
-            "constraint_type",
-            "constraint_name",
-            "referenced_schema",
-            "referenced_table",
-            "referenced_column",
-            "object_type"
+        if df.empty:
+            return {}
+        # fillna first: missing values stay missing through astype(str) with pandas' string dtype
+        row_text = df[FINGERPRINT_COLUMNS[0]].fillna("").astype(str)
+        for column in FINGERPRINT_COLUMNS[1:]:
+            row_text = row_text + "\x1f" + df[column].fillna("").astype(str)
+        ordinal = df.groupby(["schema_name", "table_name", "column_name"], sort=False).ngroup()
+        rows = (
+            pd.DataFrame({
+                "schema_name": df["schema_name"], "table_name": df["table_name"],
+                "ordinal": ordinal, "row_text": row_text
+            })
+            # Constraint rows of a column come back in no particular order
+            .sort_values(["schema_name", "table_name", "ordinal", "row_text"])
+        )
+        joined = rows.groupby(["schema_name", "table_name"], sort=False)["row_text"].agg("\x1e".join)
+        return {key: hashlib.sha256(text.encode("utf-8")).hexdigest() for key, text in joined.items()}
+
+    def get_table_fingerprints(self):
+        """Return {(schema_name, table_name): fingerprint} of the Redshift tables in Neo4j for the extracted schemas."""
+        with self.driver.session() as session:
+            result = session.run(REDSHIFT_TABLE_FINGERPRINTS_QUERY, db_name=self.db_name, schemas=self.schema_names)
+            return {(record["schema_name"], record["table_name"]): record["fingerprint"] for record in result}
+
+    def refresh_metadata(self, progress=None):
+        """Re-read the catalog from the warehouse."""
+        self.columns_df = self._get_columns(progress)
+        return self.columns_df
+
+    def delta_records(self, records, imported, full_refresh=False):
+        """
+        Narrow build_records output to tables whose fingerprint differs from the
+        one in Neo4j (`imported`), and list the stale columns and dropped tables
+        to delete.
+        """
+        changed = {
+            (t["schema_name"], t["table_name"]) for t in records["tables"]
+            if full_refresh or imported.get((t["schema_name"], t["table_name"])) != t["fingerprint"]
+        }
+        present = {(t["schema_name"], t["table_name"]) for t in records["tables"]}
+        column_ids = {}
+        for c in records["columns"]:
+            key = (c["schema_name"], c["table_name"])
+            if key in changed:
+                column_ids.setdefault(key, []).append(c["id"])
+
+        deleted = [
+            {"schema_name": schema, "table_name": table, "db_name": self.db_name}
+            for schema, table in sorted(set(imported) - present)
         ]
-    
-        return pd.DataFrame(rows, columns=columns)
-
-    def import_metadata_neo4j(self):
-        def create_nodes(tx, rows):
-            for _, row in rows.iterrows():
-                # Create Table node (once per row)
-                tx.run(
-                    """
-                    MERGE (t:Table {
-                        name: $table_name,
-                        schema: $schema_name,
-                        db_name: $db_name,
-                        source: 'redshift'
-                    })
-                    SET t.object_type = $object_type
-                    """,
-                    table_name=row["table_name"],
-                    schema_name=row["schema_name"],
-                    db_name=self.db_name,
-                    object_type=row["object_type"]
-                )
+        prefix = f"{self.db_name}."
+        return {
+            "tables": [t for t in records["tables"] if (t["schema_name"], t["table_name"]) in changed],
+            "columns": [c for c in records["columns"] if (c["schema_name"], c["table_name"]) in changed],
+            "foreign_keys": [
+                fk for fk in records["foreign_keys"]
+                if tuple(fk["source_id"][len(prefix):].split(".")[:2]) in changed
+            ],
+            # Only tables that existed before can have columns to drop; dropped tables lose all of them
+            "stale_columns": [
+                {"schema_name": schema, "table_name": table, "db_name": self.db_name, "column_ids": ids}
+                for (schema, table), ids in column_ids.items() if (schema, table) in imported
+            ] + [{**table, "column_ids": []} for table in deleted],
+            "deleted_tables": deleted
+        }
 
-                # Create Column node and relationship
-                tx.run(
-                    """
-                    MERGE (c:Column {id: $id})
-                    SET c.name = $column_name,
-                        c.table_name = $table_name,
-                        c.schema = $schema_name,
-                        c.db_name = $db_name,
-                        c.data_type = $data_type,
-                        c.is_nullable = $is_nullable,
-                        c.constraint_type = $constraint_type,
-                        c.constraint_name = $constraint_name
-                    WITH c
-                    MATCH (t:Table {name: $table_name, schema: $schema_name, db_name: $db_name, source: 'redshift'})
-                    MERGE (c)-[:BELONGS_TO]->(t)
-                    """,
-                    id=f"{self.db_name}.{row['schema_name']}.{row['table_name']}.{row['column_name']}",
-                    column_name=row["column_name"],
-                    table_name=row["table_name"],
-                    schema_name=row["schema_name"],
-                    data_type=row["data_type"],
-                    is_nullable=row["is_nullable"],
-                    constraint_type=row["constraint_type"],
-                    constraint_name=row["constraint_name"],
-                    db_name=self.db_name
-                )
+    @Metrics.traced("redshift")
+    def import_metadata_neo4j(self, full_refresh=False, progress=None):
+        """
+        Sync the catalog of the extracted schemas into Neo4j. Each Table node
+        stores a fingerprint of its columns, types and constraints; unchanged
+        tables are skipped, and catalog columns and tables that no longer exist
+        in the catalog are deleted, unless dbt or query history lineage uses them. `full_refresh=True` rewrites every table.
+        Fingerprints are written last and every committed chunk is checkpointed,
+        so an interrupted import resumes where it stopped.
+        """
+        progress = progress or ImportProgress()
+        progress.phase("reading Redshift catalog")
+        columns_df = self.refresh_metadata(progress)
+        with Metrics.span("neo4j_read"):
+            imported = self.get_table_fingerprints()
+        with Metrics.span("build_records"):
+            records = self.delta_records(self.build_records(columns_df), imported, full_refresh)
 
-        def create_foreign_key_relationships(tx, rows):
-            for _, row in rows.iterrows():
-                if row["constraint_type"] == "FOREIGN KEY" and row["referenced_table"]:
-                    tx.run(
-                        """
-                        MATCH (c1:Column {name: $column_name, table_name: $table_name, schema: $schema_name})
-                        MATCH (c2:Column {name: $referenced_column, table_name: $referenced_table, schema: $referenced_schema})
-                        MERGE (c1)-[:REFERENCES]->(c2)
-                        """,
-                        column_name=row["column_name"],
-                        table_name=row["table_name"],
-                        schema_name=row["schema_name"],
-                        referenced_column=row["referenced_column"],
-                        referenced_table=row["referenced_table"],
-                        referenced_schema=row["referenced_schema"]
-                    )
+        checkpoint = ImportCheckpoint.for_name(f"redshift-{self.conn_kwargs['host']}-{self.db_name}")
+        with self.driver.session() as session, Metrics.span("neo4j_write"):
+            writer = BatchWriter(session, self.batch_size, progress, checkpoint, driver=self.driver,
+                                 parallelism=self.write_parallelism, partition_keys=WRITE_PARTITION_KEYS)
+            progress.phase("writing tables and columns")
+            print(f"🧩 Creating {len(records['tables'])} changed table and {len(records['columns'])} column nodes...")
+            writer.write(REDSHIFT_TABLES_QUERY, records["tables"])
+            writer.write(REDSHIFT_COLUMNS_QUERY, records["columns"])
+            progress.phase("writing foreign keys")
+            print(f"🔗 Creating {len(records['foreign_keys'])} foreign key relationships...")
+            writer.write(REDSHIFT_STALE_REFERENCES_QUERY, records["tables"])
+            writer.write(REFERENCES_QUERY, records["foreign_keys"])
+            progress.phase("removing dropped tables and columns")
+            writer.write(REDSHIFT_STALE_COLUMNS_QUERY, records["stale_columns"])
+            writer.write(REDSHIFT_DELETE_TABLES_QUERY, records["deleted_tables"])
+            writer.write(REDSHIFT_TABLE_FINGERPRINTS_WRITE_QUERY, records["tables"])
+        # Columns with lineage are never deleted by the catalog sync, so the reachability index is unaffected
+        checkpoint.clear()
+        progress.count("tables_written", len(records["tables"]))
+        progress.count("tables_deleted", len(records["deleted_tables"]))
+        print(f"✅ Synced {len(records['tables'])} changed tables into Neo4j ({len(records['deleted_tables'])} dropped).")
 
-        with self.driver.session() as session:
-            print("🧩 Creating table and column nodes...")
-            session.execute_write(create_nodes, self.columns_df)
-            print("🔗 Creating foreign key relationships...")
-            session.execute_write(create_foreign_key_relationships, self.columns_df)
-        print("✅ Tables and relationships imported into Neo4j.")
+    # --- Query history lineage ---
+    def load_query_watermark(self):
+        """Return the saved {"end_time", "query_id", "hashes"} state, or the initial one."""
+        state = {"end_time": datetime(1970, 1, 1), "query_id": -1, "hashes": {}}
+        if self.query_watermark_path.exists():
+            with open(self.query_watermark_path) as f:
+                saved = json.load(f)
+            # Watermarks saved before end_time was used hold a start_time, which is never later
+            state["end_time"] = datetime.fromisoformat(saved.get("end_time") or saved["start_time"])
+            state["query_id"] = saved["query_id"]
+            state["hashes"] = dict.fromkeys(saved.get("hashes", []))
+        return state
+
+    def save_query_watermark(self, state):
+        # Oldest hashes are dropped first; dicts keep insertion order
+        hashes = list(state["hashes"])[-RED_SHIFT_QUERY_HASH_HISTORY:]
+        state["hashes"] = dict.fromkeys(hashes)
+        tmp_path = self.query_watermark_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "end_time": state["end_time"].isoformat(),
+                "query_id": state["query_id"],
+                "hashes": hashes
+            }, f)
+        os.replace(tmp_path, self.query_watermark_path)
+
+    def _iter_query_history(self, conn, state):
+        """Yield chunks of (query_id, end_time, query_text) rows finished after the watermark."""
+        table = sql.SQL(".").join(sql.Identifier(part) for part in self.query_history_table.split("."))
+        query = sql.SQL(QUERY_HISTORY_QUERY).format(table=table)
+        try:
+            # System tables live on the leader node, which does not support server-side cursors
+            with conn.cursor() as cur:
+                cur.execute(query, {"end_time": state["end_time"], "query_id": state["query_id"]})
+                while True:
+                    rows = cur.fetchmany(self.fetch_size)
+                    if not rows:
+                        break
+                    yield rows
+        finally:
+            conn.rollback()
+
+    def _qualify(self, table_name):
+        """Split a (possibly unqualified) table name into lower-cased (db, schema, table)."""
+        parts = [part.lower() for part in table_name.split(".")]
+        if len(parts) == 1:
+            return self.db_name, RED_SHIFT_DEFAULT_SCHEMA, parts[0]
+        if len(parts) == 2:
+            return self.db_name, parts[0], parts[1]
+        return parts[-3], parts[-2], parts[-1]
+
+    def build_query_lineage_records(self, lineages):
+        """
+        Turn extract_write_lineage results into deduplicated Column,
+        BELONGS_TO and TRANSFORMED_TO records.
+        """
+        columns = {}
+        belongs_to = {}
+        transformed_to = set()
+
+        def add_column(table_name, column_name):
+            db_name, schema, table = self._qualify(table_name)
+            column_id = f"{db_name}.{schema}.{table}.{column_name}"
+            if column_id not in columns:
+                columns[column_id] = {
+                    "id": column_id,
+                    "name": column_name,
+                    "table_name": table,
+                    "schema": schema,
+                    "db_name": db_name
+                }
+                belongs_to[column_id] = {
+                    "column_id": column_id,
+                    "table_name": table,
+                    "schema": schema,
+                    "db_name": db_name,
+                    "source": "redshift"
+                }
+            return column_id
+
+        for lineage in lineages:
+            if not lineage:
+                continue
+            for target_column, sources in lineage["columns"].items():
+                target_id = add_column(lineage["target"], target_column)
+                for source in sources:
+                    source_id = add_column(source["table"], source["column"])
+                    transformed_to.add((source_id, target_id))
+
+        return {
+            "columns": list(columns.values()),
+            "belongs_to": list(belongs_to.values()),
+            "transformed_to": [
+                {"source_id": source_id, "target_id": target_id}
+                for source_id, target_id in sorted(transformed_to)
+            ]
+        }
+
+    @Metrics.traced("redshift_queries")
+    def import_query_history(self, progress=None):
+        """
+        Mine column lineage of INSERT ... SELECT and CTAS statements run outside dbt.
+
+        Reads successful statements from the query history table that finished
+        after the saved watermark, skips statements whose normalised SQL was already seen,
+        parses the rest in parallel and writes Column, BELONGS_TO and
+        TRANSFORMED_TO in batches. The watermark is saved after every chunk, so
+        an interrupted run resumes where it stopped.
+        """
+        progress = progress or ImportProgress()
+        progress.phase("reading Redshift query history")
+        state = self.load_query_watermark()
+        pool = get_connection_pool(self.conn_kwargs, self.workers)
+        conn = pool.getconn()
+        mined = 0
+        try:
+            with self.driver.session() as session, LineagePool(LINEAGE_WORKERS) as lineage_pool:
+                for rows in Metrics.timed_iter(self._iter_query_history(conn, state), "redshift_query_history"):
+                    progress.count("queries_read", len(rows))
+                    Metrics.count("lineage_rows_read_total", len(rows))
+                    statements = {}
+                    for query_id, end_time, query_text in rows:
+                        digest = sql_hash(query_text)
+                        if digest not in state["hashes"]:
+                            statements[digest] = query_text
+                        state["hashes"][digest] = None
+
+                    with Metrics.span("sql_parse"):
+                        lineage = extract_lineage_batch(
+                            statements,
+                            dialect="redshift",
+                            workers=LINEAGE_WORKERS,
+                            cache_dir=None,
+                            extractor=extract_write_lineage,
+                            pool=lineage_pool
+                        )
+                    records = self.build_query_lineage_records(lineage.values())
+
+                    with Metrics.span("neo4j_write"):
+                        write_batches(session, COLUMN_NODES_QUERY, records["columns"], self.batch_size, progress)
+                        write_batches(session, BELONGS_TO_QUERY, records["belongs_to"], self.batch_size, progress)
+                        write_batches(session, TRANSFORMED_TO_QUERY, records["transformed_to"], self.batch_size, progress)
+                    if self.reachability_index is not None:
+                        self.reachability_index.add_column_records(records)
+                        self.reachability_index.save()
+
+                    mined += len(statements)
+                    progress.count("queries_parsed", len(statements))
+                    state["query_id"], state["end_time"] = rows[-1][0], rows[-1][1]
+                    self.save_query_watermark(state)
+                    print(f"🧩 Mined {len(statements)} new statements ({len(records['transformed_to'])} column edges)...")
+        finally:
+            pool.putconn(conn, close=bool(conn.closed))
+        print(f"✅ Mined lineage of {mined} statements from {self.query_history_table}.")
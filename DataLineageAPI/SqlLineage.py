@@ -0,0 +1,436 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import sqlglot
+from sqlglot import parse_one, exp
+from sqlglot.optimizer.scope import build_scope
+
+from dotenv import load_dotenv
+
+import Metrics
+
+load_dotenv()
+
+# Worker processes used to parse compiled SQL
+LINEAGE_WORKERS = int(os.getenv("LINEAGE_WORKERS", str(os.cpu_count() or 1)))
+# Directory of the persistent lineage cache (defaults to <dbt project>/target/lineage_cache)
+LINEAGE_CACHE_DIR = os.getenv("LINEAGE_CACHE_DIR")
+
+# Bump whenever extract_source_from_sql changes its output, so cached results are not reused
+LINEAGE_RESOLVER_VERSION = "2"
+
+def safe_name(part):
+    """Return cleaned identifier whether it's a string or AST node."""
+    if part is None:
+        return None
+    if hasattr(part, "sql"):
+        return part.sql().replace('"', '')
+    return str(part).replace('"', '')
+
+
+def table_full_name(table):
+    """Return the db.schema.table name of a sqlglot Table node."""
+    parts = [safe_name(p) for p in (table.catalog, table.db, table.name)]
+    return ".".join(p for p in parts if p)
+
+
+def _is_star(sel):
+    return isinstance(sel, exp.Star) or (isinstance(sel, exp.Column) and isinstance(sel.this, exp.Star))
+
+
+def _output_name(sel):
+    """Name under which a SELECT expression appears in the lineage output."""
+    if isinstance(sel, exp.Alias):
+        return sel.alias
+    if isinstance(sel, exp.Column):
+        return sel.name
+    return sel.sql()
+
+
+def _dedupe(sources):
+    seen = set()
+    unique = []
+    for source in sources:
+        key = (source["table"], source["column"])
+        if key not in seen:
+            seen.add(key)
+            unique.append(source)
+    return unique
+
+
+class ScopeLineageResolver:
+    """
+    Resolve output columns to physical source columns in a single walk of the
+    scope tree.
+
+    The output columns of every scope (CTE, derived table, subquery, set
+    operation branch) are resolved exactly once and memoised, so CTE chains
+    are followed back to physical tables without rescanning the tree for
+    every column that references them.
+
+    `schema` ({"db.schema.table": {column: data_type}}, lowercased, e.g. from
+    dbt's catalog.json) lets `*` over physical tables expand to their columns
+    and unqualified columns resolve to the table that has them.
+    """
+    def __init__(self, schema=None):
+        self._outputs = {}
+        self.schema = schema or {}
+
+    def _table_columns(self, table):
+        """Columns of a physical table known to the schema, or None."""
+        return self.schema.get(table_full_name(table).lower())
+
+    def outputs(self, scope):
+        """Return {output_column: [{"table", "column"}, ...]} for a scope, memoised."""
+        key = id(scope)
+        if key not in self._outputs:
+            self._outputs[key] = self._resolve_scope(scope)
+        return self._outputs[key]
+
+    def _resolve_scope(self, scope):
+        branches = getattr(scope, "set_operation_scopes", None) or getattr(scope, "union_scopes", None)
+        if branches:
+            # UNION / EXCEPT / INTERSECT: names come from the left branch, sources from both, by position
+            left, right = (list(self.outputs(branch).items()) for branch in branches)
+            return {
+                name: _dedupe(sources + (right[i][1] if i < len(right) else []))
+                for i, (name, sources) in enumerate(left)
+            }
+
+        lineage = {}
+        for sel in scope.expression.selects:
+            if _is_star(sel):
+                lineage.update(self._expand_star(scope, sel.table if isinstance(sel, exp.Column) else None))
+                continue
+
+            lineage[_output_name(sel)] = _dedupe(self._expression_sources(scope, sel))
+        return lineage
+
+    def _expression_sources(self, scope, expression):
+        """Source columns of an expression; columns of nested subqueries resolve in their own scope."""
+        sources = []
+        nested = {id(s.expression): s for s in scope.subquery_scopes}
+        for col in expression.find_all(exp.Column):
+            if isinstance(col.this, exp.Star):
+                continue
+            owner = col.find_ancestor(exp.Select)
+            if owner is scope.expression or owner is None:
+                sources.extend(self._resolve_column(scope, col))
+            elif id(owner) in nested:
+                for subquery_sources in self.outputs(nested[id(owner)]).values():
+                    sources.extend(subquery_sources)
+        return sources
+
+    def _expand_star(self, scope, table_alias=None):
+        """Expand `*` / `alias.*` over derived sources; physical tables stay as `*`."""
+        expanded = {}
+        for alias, (_, source) in scope.selected_sources.items():
+            if table_alias and alias != table_alias:
+                continue
+            if isinstance(source, exp.Table):
+                columns = self._table_columns(source)
+                if columns is None:
+                    expanded.setdefault("*", []).append({"table": table_full_name(source), "column": "*"})
+                    continue
+                for column in columns:
+                    expanded.setdefault(column, []).append({"table": table_full_name(source), "column": column})
+            else:
+                expanded.update(self.outputs(source))
+        return expanded
+
+    def _find_source(self, scope, column_name):
+        """Pick the source of an unqualified column."""
+        selected = list(scope.selected_sources.values())
+        if len(selected) == 1:
+            return selected[0][1]
+        # Prefer a source that is known to expose the column: a derived source, or a table of the schema
+        for _, source in selected:
+            if isinstance(source, exp.Table):
+                columns = self._table_columns(source)
+                if columns is not None and column_name.lower() in columns:
+                    return source
+            elif column_name in self.outputs(source):
+                return source
+        # Otherwise fall back to the first physical table in FROM order
+        for _, source in selected:
+            if isinstance(source, exp.Table):
+                return source
+        return selected[0][1] if selected else None
+
+    def _resolve_column(self, scope, col):
+        if col.table:
+            source = scope.sources.get(col.table)
+        else:
+            source = self._find_source(scope, col.name)
+
+        if source is None:
+            # Correlated reference or unknown alias: keep what the SQL says
+            return [{"table": col.table, "column": col.name}] if col.table else []
+        if isinstance(source, exp.Table):
+            return [{"table": table_full_name(source), "column": col.name}]
+
+        outputs = self.outputs(source)
+        if col.name in outputs:
+            return outputs[col.name]
+        # Column passed through a `SELECT *` of a physical table
+        return [{"table": s["table"], "column": col.name} for s in outputs.get("*", [])]
+
+
+def extract_source_from_sql(sql, dialect=None, schema=None):
+    """
+    Return {output_column: [{"table": "db.schema.table", "column": name}, ...]}
+    for the final SELECT of `sql`, following CTEs and subqueries back to
+    physical tables (see ScopeLineageResolver for `schema`).
+    """
+    ast = parse_one(sql, read=dialect)
+    root = build_scope(ast)
+    if root is None:
+        return {}
+
+    column_lineage = ScopeLineageResolver(schema).outputs(root)
+    # Unexpanded stars have no column-level lineage
+    if "*" in column_lineage:
+        column_lineage["*"] = []
+    return column_lineage
+
+
+def extract_write_lineage(sql, dialect=None, schema=None):
+    """
+    Return {"target": "db.schema.table", "columns": {target_column: [sources]}}
+    for an INSERT ... SELECT or CREATE TABLE ... AS SELECT statement, mapping
+    an explicit INSERT column list positionally. Other statements return {}.
+    """
+    ast = parse_one(sql, read=dialect)
+    if isinstance(ast, exp.Insert):
+        target, query = ast.this, ast.expression
+    elif isinstance(ast, exp.Create) and str(ast.args.get("kind") or "").upper() == "TABLE":
+        target, query = ast.this, ast.expression
+    else:
+        return {}
+    # INSERT ... VALUES and plain CREATE TABLE carry no lineage
+    if not isinstance(query, exp.Query):
+        return {}
+
+    query = query.copy()
+    # WITH ... INSERT INTO t SELECT ...: the CTEs belong to the SELECT
+    with_key = "with_" if "with_" in exp.Select.arg_types else "with"
+    if ast.args.get(with_key) and not query.args.get(with_key):
+        query.set(with_key, ast.args[with_key].copy())
+
+    target_columns = []
+    if isinstance(target, exp.Schema):
+        target_columns = [column.name for column in target.expressions]
+        target = target.this
+    if not isinstance(target, exp.Table):
+        return {}
+
+    root = build_scope(query)
+    if root is None:
+        return {}
+    outputs = ScopeLineageResolver(schema).outputs(root)
+
+    selects = query.selects
+    if target_columns and len(target_columns) == len(selects) and not any(_is_star(sel) for sel in selects):
+        columns = {column: outputs.get(_output_name(sel), []) for column, sel in zip(target_columns, selects)}
+    else:
+        columns = {column: sources for column, sources in outputs.items() if column != "*"}
+    return {"target": table_full_name(target), "columns": columns}
+
+
+def normalize_sql(sql):
+    """
+    Collapse literals, comments, whitespace and case so that re-runs of the
+    same statement with different values normalise to the same text.
+    """
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"/\*.*?\*/", " ", sql, flags=re.DOTALL)
+    sql = re.sub(r"--[^\n]*", " ", sql)
+    sql = re.sub(r"\b\d+(?:\.\d+)?\b", "?", sql)
+    sql = re.sub(r"\s+", " ", sql)
+    return sql.strip().rstrip(";").strip().lower()
+
+
+def schema_digest(schema, types=False, tables=None):
+    """
+    Hash of the tables and columns of a schema map, and of their types with
+    `types=True` (they do not change lineage). `tables` narrows it to those
+    tables; tables missing from the schema are hashed as missing.
+    """
+    schema = schema or {}
+    digest = hashlib.sha256()
+    for table in sorted(schema if tables is None else set(tables)):
+        columns = schema.get(table)
+        if columns is not None and not types:
+            columns = list(columns)
+        digest.update(json.dumps([table, columns], sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def sql_hash(sql):
+    """sha256 of the normalised statement."""
+    return hashlib.sha256(normalize_sql(sql).encode("utf-8")).hexdigest()
+
+
+class LineageCache:
+    """
+    On-disk cache of column lineage, one JSON file per compiled SQL statement.
+
+    Entries are keyed by the hash of the SQL text, the sqlglot version, the
+    dialect, the resolver version and the tables of the schema map the
+    statement reads, so they stay valid across runs and API restarts and are
+    never reused after an upgrade or a change to those tables.
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+
+    @staticmethod
+    def key(sql, dialect=None, extractor=None, schema_hash=None):
+        digest = hashlib.sha256()
+        # Results of extract_source_from_sql without a schema keep their original keys
+        namespace = () if extractor in (None, extract_source_from_sql) else (extractor.__name__,)
+        if schema_hash:
+            namespace += (f"schema:{schema_hash}",)
+        for part in (LINEAGE_RESOLVER_VERSION, sqlglot.__version__, dialect or "", *namespace, sql):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key, lineage):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so concurrent readers never see a partial file
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(lineage, f)
+        os.replace(tmp_path, path)
+
+
+# Schema map of a worker process, sent once through the pool initializer instead of with every job
+_worker_schema = None
+
+
+def _init_worker(schema):
+    global _worker_schema
+    _worker_schema = schema
+
+
+def _extract_one(args, schema=None):
+    sql, dialect, extractor = args
+    try:
+        if schema:
+            return extractor(sql, dialect, schema=schema), None
+        return extractor(sql, dialect), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def _extract_one_in_worker(args):
+    return _extract_one(args, _worker_schema)
+
+
+class LineagePool:
+    """
+    Worker processes parsing SQL for extract_lineage_batch, shared by every
+    batch of an import. Started on first use with `schema` sent once through
+    the initializer; use as a context manager so the workers are shut down.
+    """
+    def __init__(self, workers=LINEAGE_WORKERS, schema=None):
+        self.workers = workers
+        self.schema = schema
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def map(self, jobs):
+        if self._executor is None:
+            # Forked workers would inherit the Neo4j driver, connection pools and locks of the importing threads
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(start_method),
+                                                 initializer=_init_worker, initargs=(self.schema,))
+        chunksize = max(1, len(jobs) // (self.workers * 4))
+        return list(self._executor.map(_extract_one_in_worker, jobs, chunksize=chunksize))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def extract_lineage_batch(sqls, dialect=None, workers=LINEAGE_WORKERS, cache_dir=LINEAGE_CACHE_DIR,
+                          extractor=extract_source_from_sql, schema=None, schema_hashes=None, pool=None):
+    """
+    Extract column lineage for many SQL statements at once.
+
+    `sqls` maps an arbitrary key (e.g. a model id) to its compiled SQL; the
+    result maps the same keys to the output of `extractor` (a module-level
+    function, so it can be sent to worker processes), given the optional
+    `schema` map. Cached results are reused, the rest are parsed over a process pool of
+    `workers` processes and written back to the cache. Statements sqlglot
+    cannot parse get empty lineage (and are not cached).
+
+    `schema_hashes` maps keys to the schema_digest of the part of `schema`
+    their statement reads (e.g. a model and its depends_on tables), so their
+    cache entries survive changes to unrelated tables; other keys are cached
+    against the whole schema. `pool` is a LineagePool started with the same
+    `schema`, reused instead of starting worker processes for this call.
+    """
+    cache = LineageCache(cache_dir) if cache_dir else None
+    schema_hashes = schema_hashes or {}
+    full_schema_hash = None
+    results = {}
+    misses = {}
+
+    for name, sql in sqls.items():
+        schema_hash = schema_hashes.get(name)
+        if schema and schema_hash is None:
+            full_schema_hash = full_schema_hash or schema_digest(schema)
+            schema_hash = full_schema_hash
+        key = LineageCache.key(sql, dialect, extractor, schema_hash)
+        lineage = cache.get(key) if cache else None
+        if lineage is None:
+            misses.setdefault(key, []).append(name)
+        else:
+            results[name] = lineage
+
+    if misses:
+        keys = list(misses)
+        jobs = [(sqls[misses[key][0]], dialect, extractor) for key in keys]
+        if pool is not None and pool.workers > 1 and len(jobs) > 1:
+            parsed = pool.map(jobs)
+        elif pool is None and workers > 1 and len(jobs) > 1:
+            with LineagePool(min(workers, len(jobs)), schema) as pool:
+                parsed = pool.map(jobs)
+        else:
+            parsed = [_extract_one(job, schema) for job in jobs]
+
+        for key, (lineage, error) in zip(keys, parsed):
+            if error is not None:
+                print(f"⚠️ Could not parse SQL of {', '.join(map(str, misses[key]))}: {error}")
+                Metrics.count("lineage_parse_failures_total", len(misses[key]))
+                lineage = {}
+            elif cache:
+                cache.put(key, lineage)
+            for name in misses[key]:
+                results[name] = lineage
+
+    return results
@@ -0,0 +1,228 @@
+"""
+Command-line import runner, to run and profile imports outside the API process:
+
+    python cli.py compile --state-modified
+    python cli.py import-dbt --full-refresh --workers 8 --batch-size 5000
+    python cli.py import-all --dry-run --profile /tmp/lineage-profile
+
+--profile DIR writes <command>.prof (cProfile stats of the main thread: open
+with snakeviz, or turn into a flame graph with flameprof / gprof2dot) and
+<command>.phases.json, and prints the time spent in each import phase.
+"""
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from neo4j import GraphDatabase
+
+import Metrics
+import Neo4jClient
+from Benchmark import RecordingStats, RecordingTransaction
+from ImportJobs import ImportProgress
+from Neo4jClient import close_drivers
+from ReachabilityIndex import REACHABILITY_INDEX_PATH, ReachabilityIndex
+from SourceConnector import (DbtSourceConnector, RedshiftSourceConnector, close_connection_pools,
+                             NEO4J_PASSWORD, NEO4J_URI, NEO4J_USERNAME)
+
+load_dotenv()
+
+# dbt project imported by compile / import-dbt / import-all unless --project is given
+DBT_PROJECT_PATH = os.getenv("DBT_PROJECT_PATH")
+
+# Functions listed from the cProfile stats after a profiled run
+PROFILE_TOP_FUNCTIONS = 25
+
+
+# --- Dry runs: reads go to Neo4j, writes are only counted ---
+class DryRunSession:
+    def __init__(self, session, stats, lock):
+        self.session = session
+        self.stats = stats
+        self.lock = lock
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self.session.close()
+
+    def run(self, query, parameters=None, **kwargs):
+        return self.session.run(query, parameters, **kwargs)
+
+    def execute_read(self, work, *args, **kwargs):
+        return self.session.execute_read(work, *args, **kwargs)
+
+    def execute_write(self, work, *args, **kwargs):
+        with self.lock:
+            self.stats.transactions += 1
+            return work(RecordingTransaction(self.stats), *args, **kwargs)
+
+
+class DryRunDriver:
+    """Wraps a neo4j.Driver: auto-commit reads run for real, write transactions are recorded and dropped."""
+    def __init__(self, driver):
+        self.driver = driver
+        self.stats = RecordingStats()
+        self._lock = threading.Lock()
+
+    def session(self, **kwargs):
+        return DryRunSession(self.driver.session(**kwargs), self.stats, self._lock)
+
+    def close(self):
+        self.driver.close()
+
+
+# --- Commands ---
+def compile_dbt(args, dbt_connector, progress):
+    if args.dry_run:
+        state = "is up to date, compile would be skipped" if dbt_connector.is_compiled(state_modified=args.state_modified) and not args.force else "would be compiled"
+        print(f"🔍 Dry run: dbt project {state}")
+        return
+    dbt_connector.compile_dbt_model(force=args.force, state_modified=args.state_modified, progress=progress)
+
+
+def import_dbt(args, dbt_connector, progress):
+    if args.compile:
+        compile_dbt(args, dbt_connector, progress)
+    dbt_connector.import_metadata_neo4j(full_refresh=args.full_refresh, progress=progress)
+
+
+def import_redshift(args, redshift_connector, progress):
+    redshift_connector.import_metadata_neo4j(full_refresh=args.full_refresh, progress=progress)
+
+
+def run_command(args, driver=None):
+    connector_kwargs = {
+        name: value for name, value in (
+            ("batch_size", args.batch_size),
+            ("workers", args.workers),
+            ("write_parallelism", args.write_parallelism),
+        ) if value is not None
+    }
+    # Kept in step with the graph like the API does; a dry run writes nothing, so the index is left alone
+    if REACHABILITY_INDEX_PATH and not args.dry_run:
+        connector_kwargs["reachability_index"] = ReachabilityIndex()
+    progress = ImportProgress()
+
+    if args.command in ("compile", "import-dbt", "import-all"):
+        dbt_connector = DbtSourceConnector(args.project or DBT_PROJECT_PATH, **connector_kwargs)
+        if driver is not None:
+            dbt_connector.driver = driver
+    if args.command in ("import-redshift", "import-all"):
+        redshift_connector = RedshiftSourceConnector(**connector_kwargs)
+        if driver is not None:
+            redshift_connector.driver = driver
+
+    if args.command == "compile":
+        compile_dbt(args, dbt_connector, progress)
+    elif args.command == "import-dbt":
+        import_dbt(args, dbt_connector, progress)
+    elif args.command == "import-redshift":
+        import_redshift(args, redshift_connector, progress)
+    elif args.command == "import-all":
+        # One after the other, so phase timings and profiles are not interleaved
+        import_dbt(args, dbt_connector, progress)
+        import_redshift(args, redshift_connector, progress)
+    return progress
+
+
+def print_phase_summary(trace, elapsed):
+    print(f"⏱️ Phase summary ({elapsed:.2f}s wall, nested phases overlap):")
+    phases = sorted(trace.summary().items(), key=lambda item: item[1], reverse=True)
+    width = max((len(phase) for phase, _ in phases), default=0)
+    for phase, seconds in phases:
+        print(f"   {phase:<{width}}  {seconds:10.3f}s  {100 * seconds / elapsed if elapsed else 0:5.1f}%")
+    for name, value in sorted(trace.counters.items()):
+        print(f"   {name} = {value}")
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--workers", type=int, help="processes parsing SQL (dbt) / threads reading the catalog (Redshift)")
+    common.add_argument("--batch-size", type=int, help="rows per Neo4j transaction to start from")
+    common.add_argument("--write-parallelism", type=int, help="sessions writing to Neo4j concurrently")
+    common.add_argument("--dry-run", action="store_true",
+                        help="read sources and Neo4j but only count the writes (no dbt compile, no checkpoints)")
+    common.add_argument("--profile", metavar="DIR", help="write cProfile stats and a phase summary to DIR")
+    common.add_argument("--project", help="dbt project directory (default DBT_PROJECT_PATH)")
+
+    parser = argparse.ArgumentParser(description="Run lineage imports into Neo4j.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compile_parser = commands.add_parser("compile", parents=[common], help="compile the dbt project")
+    compile_parser.add_argument("--force", action="store_true", help="compile even if the project is unchanged")
+    compile_parser.add_argument("--state-modified", action="store_true", help="compile state:modified+ only")
+    dbt_parser = commands.add_parser("import-dbt", parents=[common], help="import dbt models and column lineage")
+    dbt_parser.add_argument("--compile", action="store_true", help="compile the dbt project first")
+    dbt_parser.add_argument("--state-modified", action="store_true", help="with --compile, compile state:modified+ only")
+    redshift_parser = commands.add_parser("import-redshift", parents=[common], help="import the Redshift catalog")
+    all_parser = commands.add_parser("import-all", parents=[common], help="import dbt, then Redshift")
+    for subparser in (dbt_parser, redshift_parser, all_parser):
+        subparser.add_argument("--full-refresh", action="store_true", help="rewrite everything, not just what changed")
+    all_parser.add_argument("--compile", action="store_true", help="compile the dbt project first")
+    all_parser.add_argument("--state-modified", action="store_true", help="with --compile, compile state:modified+ only")
+    args = parser.parse_args()
+    args.force = getattr(args, "force", False)
+
+    driver = None
+    checkpoint_dir = None
+    if args.dry_run:
+        driver = DryRunDriver(GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD)))
+        # Dry runs must neither use nor clear the checkpoints of a real interrupted import
+        checkpoint_dir = tempfile.TemporaryDirectory()
+        Neo4jClient.IMPORT_CHECKPOINT_DIR = checkpoint_dir.name
+
+    profiler = cProfile.Profile() if args.profile else None
+    started = time.perf_counter()
+    try:
+        with Metrics.collect_trace(args.command) as trace:
+            if profiler is not None:
+                profiler.enable()
+            try:
+                progress = run_command(args, driver)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+    finally:
+        elapsed = time.perf_counter() - started
+        if driver is not None:
+            driver.close()
+        if checkpoint_dir is not None:
+            checkpoint_dir.cleanup()
+        close_connection_pools()
+        close_drivers()
+
+    if driver is not None:
+        print("🔍 Dry run, nothing written: " + ", ".join(f"{key}={value}" for key, value in driver.stats.to_dict().items()))
+
+    if profiler is not None:
+        profile_dir = Path(args.profile)
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        profile_path = profile_dir / f"{args.command}.prof"
+        profiler.dump_stats(profile_path)
+        with open(profile_dir / f"{args.command}.phases.json", "w") as f:
+            json.dump({
+                **trace.to_dict(),
+                "elapsed_seconds": round(elapsed, 6),
+                "progress": progress.counts,
+                "dry_run": driver.stats.to_dict() if driver is not None else None,
+            }, f, indent=2)
+        pstats.Stats(str(profile_path)).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        print_phase_summary(trace, elapsed)
+        print(f"📄 Wrote {profile_path} and {args.command}.phases.json to {profile_dir}")
+
+    print(f"✅ {args.command} finished in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,16 @@
-from SourceConnector import DbtSourceConnector, RedshiftSourceConnector
+from contextlib import asynccontextmanager
+import threading
+from SourceConnector import DbtSourceConnector, RedshiftSourceConnector, close_connection_pools
+from DbtFederation import DbtFederation
+from Neo4jClient import check_schema, close_drivers, get_driver
+from ImportJobs import ImportJobManager
+from LineageQueries import LineageQueryService
+from ReachabilityIndex import REACHABILITY_INDEX_PATH, ReachabilityIndex, model_key
+import Metrics
 from pydantic import BaseModel
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from typing import Literal
 from dotenv import load_dotenv
 import os
 
@@ -20,46 +30,160 @@ RED_SHIFT_DBNAME = os.getenv("RED_SHIFT_DBNAME")
 RED_SHIFT_USER = os.getenv("RED_SHIFT_USER")
 RED_SHIFT_PASSWORD = os.getenv("RED_SHIFT_PASSWORD")
 RED_SHIFT_SCHEMA = os.getenv("RED_SHIFT_SCHEMA")
-app = FastAPI(title="Metadata → Neo4j API")
 
+# Precomputed impact lookups, updated by every import (only when REACHABILITY_INDEX_PATH is set)
+reachability_index = ReachabilityIndex() if REACHABILITY_INDEX_PATH else None
+# Connectors are cheap to build: Neo4j and Redshift are only contacted on first use
+dbt_connector = DbtSourceConnector(DBT_PROJECT_PATH, reachability_index=reachability_index)
+# Every project listed in DBT_PROJECT_PATHS, stitched together through their sources
+dbt_federation = DbtFederation(reachability_index=reachability_index)
+redshift_connector = RedshiftSourceConnector(reachability_index=reachability_index)
+jobs = ImportJobManager()
+lineage_queries = LineageQueryService()
+# Cached lineage results are stale as soon as an import has written to the graph
+jobs.on_finished(lambda job: lineage_queries.cache.invalidate())
 
-dbt_connector = DbtSourceConnector()
-redshift_connector = RedshiftSourceConnector()
+
+def check_neo4j_schema():
+    check_schema(get_driver(NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Checked in the background so startup never waits on Neo4j
+    threading.Thread(target=check_neo4j_schema, daemon=True).start()
+    yield
+    jobs.shutdown()
+    close_drivers()
+    close_connection_pools()
+
+
+app = FastAPI(title="Metadata → Neo4j API", lifespan=lifespan)
 
 @app.get("/")
 def home():
     return {"message": "Welcome to Metadata → Neo4j API"}
 
-@app.post("/compile_dbt")
-def compile_models():
-    try:
-        dbt_connector.compile_dbt_model()
-        return {"status": "success", "message": "DBT models compiled successfully."}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+@app.post("/compile_dbt", status_code=202)
+def compile_models(force: bool = False, state_modified: bool = False):
+    # dbt output is streamed into the job log
+    job = jobs.submit("dbt_compile", lambda job: dbt_connector.compile_dbt_model(
+        force=force, state_modified=state_modified, progress=job))
+    return {"status": "accepted", "job_id": job.id, "message": "Compilation of dbt models started."}
 
-@app.post("/import_dbt")
-def import_metadata(r):
-    try:
-        dbt_connector.import_metadata_neo4j()
-        return {"status": "success", "message": "Metadata from dbt imported into Neo4j."}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    
-@app.post("/import_redshift")
-def import_metadata():
-    try:
-        redshift_connector.import_metadata_neo4j()
-        return {"status": "success", "message": "Metadata from redshift imported into Neo4j."}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    
-@app.post("/import")
-def import_metadata():
+@app.post("/import_dbt", status_code=202)
+def import_metadata(full_refresh: bool = False, compile: bool = False, state_modified: bool = False):
+    def run(job):
+        if compile:
+            dbt_connector.compile_dbt_model(state_modified=state_modified, progress=job)
+        dbt_connector.import_metadata_neo4j(full_refresh=full_refresh, progress=job)
+
+    job = jobs.submit("dbt", run)
+    return {"status": "accepted", "job_id": job.id, "message": "Import of dbt metadata started."}
+
+@app.post("/import_dbt_federation", status_code=202)
+def import_dbt_federation(full_refresh: bool = False):
+    job = jobs.submit("dbt_federation", lambda job: dbt_federation.import_metadata_neo4j(full_refresh=full_refresh, progress=job))
+    return {"status": "accepted", "job_id": job.id, "message": f"Import of {len(dbt_federation.connectors)} dbt projects started."}
+
+@app.post("/import_redshift", status_code=202)
+def import_redshift_metadata():
+    job = jobs.submit("redshift", lambda job: redshift_connector.import_metadata_neo4j(progress=job))
+    return {"status": "accepted", "job_id": job.id, "message": "Import of redshift metadata started."}
+
+@app.post("/import_redshift_queries", status_code=202)
+def import_redshift_query_lineage():
+    job = jobs.submit("redshift_queries", lambda job: redshift_connector.import_query_history(progress=job))
+    return {"status": "accepted", "job_id": job.id, "message": "Mining of redshift query history started."}
+
+@app.post("/import", status_code=202)
+def import_all_metadata():
+    job = jobs.submit_group("all", {
+        "dbt": lambda job: dbt_connector.import_metadata_neo4j(progress=job),
+        "redshift": lambda job: redshift_connector.import_metadata_neo4j(progress=job)
+    })
+    return {"status": "accepted", "job_id": job.id, "message": "Import of all sources started."}
+
+@app.get("/jobs")
+def list_jobs():
+    return [job.to_dict() for job in jobs.list()]
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_dict()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(Metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+def run_lineage_query(level, direction, key, depth, skip, limit):
     try:
-        dbt_connector.import_metadata_neo4j()
-        redshift_connector.import_metadata_neo4j()
-        return {"status": "success", "message": "Metadata from all sources imported into Neo4j."}
+        return lineage_queries.traverse(level, direction, key, depth=depth, skip=skip, limit=limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    
\ No newline at end of file
+
+@app.get("/lineage/columns/{column_id}/{direction}")
+def column_lineage(column_id: str, direction: Literal["upstream", "downstream"],
+                   depth: int = Query(3, ge=1), skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    return run_lineage_query("column", direction, {"id": column_id}, depth, skip, limit)
+
+@app.get("/lineage/models/{model_id}/{direction}")
+def model_lineage(model_id: str, direction: Literal["upstream", "downstream"],
+                  depth: int = Query(3, ge=1), skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    return run_lineage_query("model", direction, {"id": model_id}, depth, skip, limit)
+
+# depth counts table-to-table steps (Table -> DbtModel -> Table)
+@app.get("/lineage/tables/{db_name}/{schema}/{name}/{direction}")
+def table_lineage(db_name: str, schema: str, name: str, direction: Literal["upstream", "downstream"],
+                  depth: int = Query(3, ge=1), skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    return run_lineage_query("table", direction, {"db_name": db_name, "schema": schema, "name": name}, depth, skip, limit)
+
+def require_reachability_index():
+    if reachability_index is None:
+        raise HTTPException(status_code=404, detail="Reachability index is not enabled (set REACHABILITY_INDEX_PATH)")
+    return reachability_index
+
+@app.post("/impact/rebuild", status_code=202)
+def rebuild_reachability_index():
+    index = require_reachability_index()
+    job = jobs.submit("reachability_rebuild", lambda job: index.rebuild_from_neo4j(get_driver(NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD)))
+    return {"status": "accepted", "job_id": job.id, "message": "Rebuild of the reachability index started."}
+
+@app.get("/impact/stats")
+def reachability_stats():
+    return require_reachability_index().stats()
+
+@app.get("/impact/columns/{column_id}/{direction}")
+def column_impact(column_id: str, direction: Literal["upstream", "downstream"]):
+    index = require_reachability_index()
+    results = index.ancestors("column", column_id) if direction == "upstream" else index.descendants("column", column_id)
+    return {"level": "column", "direction": direction, "start": column_id, "count": len(results), "results": results}
+
+@app.get("/impact/models/{model_id}/{direction}")
+def model_impact(model_id: str, direction: Literal["upstream", "downstream"]):
+    index = require_reachability_index()
+    key = model_key(model_id)
+    nodes = index.ancestors("model", key) if direction == "upstream" else index.descendants("model", key)
+    prefix = model_key("")
+    results = [node[len(prefix):] for node in nodes if node.startswith(prefix)]
+    return {"level": "model", "direction": direction, "start": model_id, "count": len(results), "results": results}
+
+@app.get("/impact/tables/{db_name}/{schema}/{name}")
+def table_impact(db_name: str, schema: str, name: str):
+    # Every model and column affected by dropping the table
+    return {"start": {"db_name": db_name, "schema": schema, "name": name},
+            **require_reachability_index().table_impact(db_name, schema, name)}
+
+@app.get("/impact/columns/{column_id}/downstream/{target_id}")
+def column_reaches(column_id: str, target_id: str):
+    return {"source": column_id, "target": target_id,
+            "downstream": require_reachability_index().reaches("column", column_id, target_id)}
+
+@app.get("/impact/models/{model_id}/downstream/{target_id}")
+def model_reaches(model_id: str, target_id: str):
+    return {"source": model_id, "target": target_id,
+            "downstream": require_reachability_index().reaches("model", model_key(model_id), model_key(target_id))}
@@ -0,0 +1,34 @@
+-- Stand-in for Redshift's SYS_QUERY_HISTORY, to try the query history lineage
+-- miner on a local PostgreSQL (RED_SHIFT_QUERY_HISTORY_TABLE=sys_query_history).
+-- Load redshift_init.sql first.
+DROP TABLE IF EXISTS sys_query_history;
+
+CREATE TABLE sys_query_history (
+  query_id     BIGINT NOT NULL,
+  start_time   TIMESTAMP NOT NULL,
+  end_time     TIMESTAMP NOT NULL,
+  status       VARCHAR(10) NOT NULL,
+  query_type   VARCHAR(10) NOT NULL,
+  query_text   VARCHAR(4000) NOT NULL
+);
+
+INSERT INTO sys_query_history VALUES
+(1, '2024-01-01 01:00:00', '2024-01-01 01:10:00', 'success', 'CTAS',
+ 'CREATE TABLE customer_region AS SELECT c_custkey, c_region AS region FROM public.customer'),
+(2, '2024-01-01 02:00:00', '2024-01-01 02:10:00', 'success', 'INSERT',
+ 'INSERT INTO customer_region (c_custkey, region) SELECT c.c_custkey, c.c_nation FROM customer c WHERE c.c_custkey > 100'),
+-- Same statement with other literals: deduplicated
+(3, '2024-01-01 02:00:00', '2024-01-01 02:10:00', 'success', 'INSERT',
+ 'INSERT INTO customer_region (c_custkey, region)
+  SELECT c.c_custkey, c.c_nation FROM customer c WHERE c.c_custkey > 200'),
+(4, '2024-01-01 03:00:00', '2024-01-01 03:10:00', 'failed', 'INSERT',
+ 'INSERT INTO customer_region SELECT p_partkey, p_name FROM part'),
+(5, '2024-01-01 04:00:00', '2024-01-01 04:10:00', 'success', 'SELECT',
+ 'SELECT * FROM customer'),
+(6, '2024-01-01 05:00:00', '2024-01-01 05:10:00', 'success', 'INSERT',
+ 'INSERT INTO public.sales_by_year (d_year, revenue)
+  WITH sales AS (SELECT lo_orderdate, lo_revenue FROM lineorder)
+  SELECT d.d_year, SUM(s.lo_revenue) FROM sales s JOIN dwdate d ON s.lo_orderdate = d.d_datekey GROUP BY d.d_year'),
+-- Long-running CTAS: started first, finished last
+(7, '2024-01-01 00:30:00', '2024-01-01 06:00:00', 'success', 'CTAS',
+ 'CREATE TABLE part_brand AS SELECT p_partkey, p_brand1 AS brand FROM public.part');